@@ -1,12 +1,29 @@
+import time
+
+import asyncpg
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from jose import JWTError, jwt
 
+import metrics
+from cache import TTLCache
 from config import get_settings
-from database import get_db_conn
 
 security = HTTPBearer(auto_error=False)
 
+# Reporter names for sighting responses. Nothing renames users yet, so entries are only
+# dropped by the TTL; a name change would show in sightings up to 10 minutes late.
+_user_names: TTLCache[str] = TTLCache(maxsize=10_000, ttl=600)
+metrics.register("user_name_cache", _user_names.stats)
+
+# Verified JWT claims by raw token, so repeat requests skip signature checks.
+# Entries expire with the token; the secret is stored to survive reload_settings().
+_settings = get_settings()
+_verified_tokens: TTLCache[tuple[int, float, str]] = TTLCache(
+    maxsize=_settings.auth_token_cache_size, ttl=_settings.auth_token_cache_ttl
+)
+metrics.register("auth_token_cache", _verified_tokens.stats)
+
 
 async def get_current_user_id(
     credentials: HTTPAuthorizationCredentials | None = Depends(security),
@@ -15,6 +32,13 @@ async def get_current_user_id(
         return None
     token = credentials.credentials
     settings = get_settings()
+    now = time.time()
+    cached = _verified_tokens.get(token)
+    if cached is not None:
+        user_id, exp, secret = cached
+        if exp > now and secret == settings.jwt_secret:
+            return user_id
+        _verified_tokens.pop(token)
     try:
         payload = jwt.decode(
             token, settings.jwt_secret, algorithms=[settings.jwt_algorithm]
@@ -22,9 +46,13 @@ async def get_current_user_id(
         sub = payload.get("sub")
         if sub is None:
             return None
-        return int(sub)
+        user_id = int(sub)
     except (JWTError, ValueError):
         return None
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)) and exp > now:
+        _verified_tokens.set(token, (user_id, float(exp), settings.jwt_secret), ttl=min(exp - now, settings.auth_token_cache_ttl))
+    return user_id
 
 
 async def require_user(user_id: int | None = Depends(get_current_user_id)) -> int:
@@ -37,10 +65,17 @@ async def require_user(user_id: int | None = Depends(get_current_user_id)) -> in
     return user_id
 
 
-async def get_user_name(user_id: int) -> str:
-    conn = await get_db_conn()
-    try:
-        row = await conn.fetchrow("SELECT name FROM users WHERE id = $1", user_id)
-        return row["name"] if row else "Unknown"
-    finally:
-        await conn.close()
+async def get_user_name(conn: asyncpg.Connection, user_id: int) -> str:
+    name = _user_names.get(user_id)
+    if name is not None:
+        return name
+    row = await conn.fetchrow("SELECT name FROM users WHERE id = $1", user_id)
+    if not row:
+        return "Unknown"
+    _user_names.set(user_id, row["name"])
+    return row["name"]
+
+
+def cache_user_name(user_id: int, name: str) -> None:
+    _user_names.set(user_id, name)
+
@@ -0,0 +1,74 @@
+import math
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = math.pi * EARTH_RADIUS_KM / 180
+
+
+def bounding_box(lat: float, lng: float, radius_km: float) -> tuple[float, float, float, float]:
+    """(min_lng, min_lat, max_lng, max_lat) enclosing a circle; used to hit the GiST point index."""
+    dlat = radius_km / KM_PER_DEGREE_LAT
+    cos_lat = math.cos(math.radians(lat))
+    if cos_lat < 1e-6 or abs(lat) + dlat >= 90:
+        return -180.0, max(-90.0, lat - dlat), 180.0, min(90.0, lat + dlat)
+    dlng = dlat / cos_lat
+    if lng - dlng < -180 or lng + dlng > 180:
+        # Crosses the antimeridian: widen to all longitudes, the distance filter still applies.
+        return -180.0, lat - dlat, 180.0, lat + dlat
+    return lng - dlng, lat - dlat, lng + dlng, lat + dlat
+
+
+MAX_MERCATOR_LAT = 85.0511287798
+MAX_ZOOM = 22
+
+BBox = tuple[float, float, float, float]  # (min_lng, min_lat, max_lng, max_lat)
+
+
+def parse_bbox(value: str) -> BBox:
+    """Parse "minLng,minLat,maxLng,maxLat"; raises ValueError on anything else."""
+    parts = [float(p) for p in value.split(",")]
+    if len(parts) != 4:
+        raise ValueError("bbox needs four numbers: minLng,minLat,maxLng,maxLat")
+    min_lng, min_lat, max_lng, max_lat = parts
+    if not (-180 <= min_lng < max_lng <= 180 and -90 <= min_lat < max_lat <= 90):
+        raise ValueError("bbox out of range or inverted")
+    return min_lng, min_lat, max_lng, max_lat
+
+
+def zoom_for_bbox(bbox: BBox) -> int:
+    """Rough slippy-map zoom at which the box spans about one tile."""
+    width = max(bbox[2] - bbox[0], 1e-9)
+    return max(0, min(MAX_ZOOM, int(math.log2(360 / width))))
+
+
+def _tile_x(lng: float, z: int) -> int:
+    n = 2 ** z
+    return min(n - 1, max(0, int((lng + 180) / 360 * n)))
+
+
+def _tile_y(lat: float, z: int) -> int:
+    n = 2 ** z
+    rad = math.radians(max(-MAX_MERCATOR_LAT, min(MAX_MERCATOR_LAT, lat)))
+    return min(n - 1, max(0, int((1 - math.asinh(math.tan(rad)) / math.pi) / 2 * n)))
+
+
+def tile_for_point(lat: float, lng: float, z: int) -> tuple[int, int]:
+    return _tile_x(lng, z), _tile_y(lat, z)
+
+
+def tiles_for_bbox(bbox: BBox, z: int) -> list[tuple[int, int]]:
+    min_lng, min_lat, max_lng, max_lat = bbox
+    x0, x1 = _tile_x(min_lng, z), _tile_x(max_lng, z)
+    y0, y1 = _tile_y(max_lat, z), _tile_y(min_lat, z)
+    return [(x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+
+
+def tile_bounds(z: int, x: int, y: int) -> BBox:
+    """Web-Mercator tile as a lng/lat box; edge rows extend to the poles so no point is lost."""
+    n = 2 ** z
+
+    def lat_of(row: int) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+    max_lat = 90.0 if y == 0 else lat_of(y)
+    min_lat = -90.0 if y == n - 1 else lat_of(y + 1)
+    return x / n * 360 - 180, min_lat, (x + 1) / n * 360 - 180, max_lat
@@ -1,14 +1,9 @@
 import asyncio
-<<<<<<< Updated upstream
-import hashlib
+import hmac
+import logging
 import os
-import secrets
-import time
-import httpx
-from functools import lru_cache
-=======
-import os
->>>>>>> Stashed changes
+import signal
+from contextlib import asynccontextmanager
 
 # Load .env as early as possible so OPENAI_KEY etc. are available in this process
 _backend_dir = os.path.dirname(os.path.abspath(__file__))
@@ -26,88 +21,87 @@ try:
 except ImportError:
     pass
 
-<<<<<<< Updated upstream
-from fastapi import FastAPI, File, Header, UploadFile, HTTPException, Request
+from fastapi import FastAPI, File, Header, HTTPException, Request, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from pydantic import BaseModel
 
-try:
-    import jwt
-except ModuleNotFoundError:
-    jwt = None  # pip install PyJWT
+import metrics
+from config import get_settings, reload_settings
+from database import acquire, close_pool, ensure_schema, force_push_schema, init_pool
+from routers import auth, leaderboard, me, scan, sightings
+from schemas import AnimalResult
+from services import inference
+from services.executor import ExecutorSaturated, inference_executor
+from services.http import close_clients, start_clients
+from services.leaderboard import snapshots as leaderboard_snapshots
+from services.passwords import PasswordHasherBusy, hasher
+from services.scan_jobs import ScanJobsBusy, jobs as scan_jobs
+from services.sightings import writer as sighting_writer
+
+
+logger = logging.getLogger(__name__)
+
+
+def _reload_settings() -> None:
+    reload_settings()
+    logger.info("Settings reloaded")
+
+
+def _watch_reload_signal(enable: bool) -> None:
+    """SIGHUP re-reads settings (kill -HUP <pid>); not available on Windows."""
+    try:
+        loop = asyncio.get_running_loop()
+        if enable:
+            loop.add_signal_handler(signal.SIGHUP, _reload_settings)
+        else:
+            loop.remove_signal_handler(signal.SIGHUP)
+    except (AttributeError, NotImplementedError, RuntimeError):
+        pass
 
-# Load .env for JWT_SECRET
-try:
-    from dotenv import load_dotenv
-    _env_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env")
-    if os.path.isfile(_env_path):
-        load_dotenv(_env_path)
-except ImportError:
-    pass
 
-JWT_SECRET = os.environ.get("JWT_SECRET", "change-me-in-production").strip().strip("'\"")
-JWT_ALGORITHM = "HS256"
-JWT_EXPIRE_SECONDS = 60 * 60 * 24 * 7  # 7 days
-
-# Database module for users and sightings
-import database as db
-
-def _hash_password(password: str) -> str:
-    salt = "snapspecies"
-    return hashlib.sha256((salt + password).encode()).hexdigest()
-
-def _get_jwt():
-    global jwt
-    if jwt is None:
-        try:
-            import jwt as _jwt
-            jwt = _jwt
-        except ModuleNotFoundError:
-            pass
-    return jwt
-
-def _create_token(email: str) -> str:
-    lib = _get_jwt()
-    if lib is None:
-        raise HTTPException(
-            status_code=503,
-            detail="PyJWT not found. In the same terminal where you run uvicorn, run: pip install PyJWT then restart the server."
-        )
-    payload = {"sub": email, "exp": int(time.time()) + JWT_EXPIRE_SECONDS}
-    return lib.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
-
-def _decode_token(token: str) -> str | None:
-    lib = _get_jwt()
-    if lib is None:
-        return None
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Ensure OPENAI_KEY is in os.environ (dotenv can miss it; inject from file if needed)
+    if not (os.environ.get("OPENAI_KEY") or os.environ.get("OPENAI_API_KEY")):
+        key_from_file = _read_openai_key_from_file()
+        if key_from_file:
+            os.environ["OPENAI_KEY"] = key_from_file
+    # Log whether OpenAI key is available (do not log the key)
     try:
-        payload = lib.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        return payload.get("sub")
+        key = (get_settings().openai_api_key or "").strip()
+        print("OpenAI key:", "loaded" if key else "NOT SET (set OPENAI_KEY in .env)")
     except Exception:
-        return None
-
-def _require_user(authorization: str | None) -> str:
-    if not authorization or not authorization.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    token = authorization[7:].strip()
-    email = _decode_token(token)
-    if not email:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    return email
-
-app = FastAPI()
-=======
-from fastapi import FastAPI, File, HTTPException, UploadFile
-from fastapi.middleware.cors import CORSMiddleware
+        print("OpenAI key: NOT SET")
+    _watch_reload_signal(True)
+    await init_pool()
+    await start_clients()
+    inference_executor.start()
+    if get_settings().inference_batching:
+        await inference.engine.start()
+    try:
+        async with acquire() as conn:
+            if get_settings().force_push_schema:
+                await force_push_schema(conn)
+            else:
+                await ensure_schema(conn)
+        await leaderboard_snapshots.start()
+        if get_settings().sighting_write_behind:
+            await sighting_writer.start()
+        await scan_jobs.start()
+        yield
+    finally:
+        _watch_reload_signal(False)
+        await scan_jobs.stop()  # jobs enqueue sightings, so stop them before the writer
+        await sighting_writer.stop()  # before the pool closes: queued sightings must be written
+        await leaderboard_snapshots.stop()
+        await inference.engine.stop()
+        inference_executor.shutdown()
+        hasher.shutdown()
+        await close_clients()
+        await close_pool()
 
-from config import get_settings
-from database import ensure_schema, force_push_schema, get_db_conn
-from routers import auth, leaderboard, me, scan, sightings
-from schemas import AnimalResult
 
-app = FastAPI(title="SnapSpecies API", version="1.0.0")
->>>>>>> Stashed changes
+app = FastAPI(title="SnapSpecies API", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -115,412 +109,37 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Location"],
 )
 
-<<<<<<< Updated upstream
 
-@app.exception_handler(Exception)
-async def global_exception_handler(request: Request, exc: Exception):
-    """Return JSON 500 for unhandled errors; let HTTPException (401, 400, etc.) through."""
-    if isinstance(exc, HTTPException):
-        raise exc
-    import traceback
-    traceback.print_exc()
+@app.exception_handler(ExecutorSaturated)
+async def executor_saturated_handler(request: Request, exc: ExecutorSaturated):
     return JSONResponse(
-        status_code=500,
-        content={"detail": "Internal server error", "type": type(exc).__name__},
+        status_code=503,
+        content={"detail": "Image recognition is busy, please retry shortly."},
+        headers={"Retry-After": str(exc.retry_after)},
     )
 
-@lru_cache(maxsize=1)
-def get_model():
-    weights = MobileNet_V3_Large_Weights.IMAGENET1K_V2
-    model = mobilenet_v3_large(weights=weights)
-    model.eval()
-    return model, weights
-
-PREPROCESS = T.Compose([
-    T.Resize(256),
-    T.CenterCrop(224),
-    T.ToTensor(),
-    T.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225]),
-])
-
-def run_mobilenet(image_bytes: bytes) -> str:
-    model, weights = get_model()
-    img = Image.open(io.BytesIO(image_bytes)).convert("RGB")
-    tensor = PREPROCESS(img).unsqueeze(0)
-    with torch.no_grad():
-        logits = model(tensor)
-        probs = torch.softmax(logits, dim=1)[0]
-    top_idx = probs.argmax().item()
-    return weights.meta["categories"][top_idx]
-
-
-IUCN_API_KEY = os.environ.get("IUCN_API_KEY", "")
-IUCN_BASE = "https://apiv3.iucnredlist.org/api/v3"
-
-IUCN_LABELS = {
-    "EX": "Extinct",
-    "EW": "Extinct in the Wild",
-    "CR": "Critically Endangered",
-    "EN": "Endangered",
-    "VU": "Vulnerable",
-    "NT": "Near Threatened",
-    "LC": "Least Concern",
-    "DD": "Data Deficient",
-    "NE": "Not Evaluated",
-}
-
-async def get_iucn_status(scientific_name: str) -> str:
-    if not IUCN_API_KEY or not scientific_name:
-        return "Unknown"
-    encoded = scientific_name.replace(" ", "%20")
-    url = f"{IUCN_BASE}/species/{encoded}?token={IUCN_API_KEY}"
-    async with httpx.AsyncClient(timeout=10) as client:
-        try:
-            resp = await client.get(url)
-            resp.raise_for_status()
-            data = resp.json()
-            if not data.get("result"):
-                return "Unknown"
-            code = data["result"][0].get("category", "NE")
-            return IUCN_LABELS.get(code, "Unknown")
-        except Exception:
-            return "Unknown"
-
-
-OPENAI_KEY = os.environ.get("OPENAI_KEY", "").strip().strip("'\"")
-
-
-async def get_species_info_openai(common_name: str, scientific_name: str) -> tuple[dict | None, bool]:
-    """Call OpenAI for population, habitat, threats, trend. Returns (info_dict, quota_exceeded)."""
-    if not OPENAI_KEY or not common_name:
-        return None, False
-    sci = scientific_name or common_name
-    prompt = f"""For the species: {common_name} (scientific name: {sci}). Return a short JSON object only, no markdown, with these exact keys:
-- "population": one short sentence on population size/trend (e.g. "Declining; about 1000 mature individuals").
-- "habitat": one short sentence on primary habitat (e.g. "Tropical forests, grasslands").
-- "threats": list of 1-3 short threat strings (e.g. ["Habitat loss", "Poaching"]).
-- "trend": exactly one of "Increasing", "Stable", "Decreasing", "Unknown".
-- "threat_score": a single integer from 0 to 100 representing overall extinction/conservation risk. Use conservation status, population trend, and threats: Critically Endangered 90-100, Endangered 70-89, Vulnerable 50-69, Near Threatened 30-49, Least Concern 0-29. Be specific per species, not always 20.
-If unsure use "Unknown" or empty list; for threat_score use your best estimate."""
-    import json
-    async with httpx.AsyncClient(timeout=15) as client:
-        try:
-            resp = await client.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers={"Authorization": f"Bearer {OPENAI_KEY}", "Content-Type": "application/json"},
-                json={
-                    "model": "gpt-4o-mini",
-                    "messages": [{"role": "user", "content": prompt}],
-                    "max_tokens": 400,
-                },
-            )
-            if resp.status_code == 429:
-                return None, True
-            resp.raise_for_status()
-            data = resp.json()
-            content = (data.get("choices") or [{}])[0].get("message", {}).get("content") or ""
-            content = content.strip().strip("`").strip()
-            if content.lower().startswith("json"):
-                content = content[4:].strip()
-            return json.loads(content), False
-        except Exception:
-            return None, False
-
-
-def _threat_score_from_endangerment(endangerment: str) -> int:
-    """Fallback threat score when OpenAI is not used or returns no score."""
-    m = {
-        "Critically Endangered": 95,
-        "Endangered": 80,
-        "Vulnerable": 65,
-        "Near Threatened": 40,
-        "Least Concern": 20,
-        "Data Deficient": 30,
-        "Not Evaluated": 20,
-    }
-    return m.get((endangerment or "").strip(), 20)
-
-
-class AnimalResult(BaseModel):
-    species: str
-    endangerment: str
-    sci: str = ""
-    threat_score: int = 20
-    population: str | None = None
-    habitat: str | None = None
-    threats: list[str] = []
-    trend: str | None = None  # Increasing | Stable | Decreasing | Unknown
-    openaiQuotaExceeded: bool = False
-
-
-class SignupBody(BaseModel):
-    username: str
-    name: str
-    email: str
-    password: str
-
-
-class LoginBody(BaseModel):
-    email: str
-    password: str
-
-
-class TokenResponse(BaseModel):
-    access_token: str
-    token_type: str = "bearer"
-
-
-@app.post("/auth/signup", response_model=TokenResponse)
-async def auth_signup(body: SignupBody):
-    email = (body.email or "").strip().lower()
-    if not email:
-        raise HTTPException(status_code=400, detail="Email required")
-    pool = await db.get_pool()
-    async with pool.acquire() as conn:
-        row = await conn.fetchrow("SELECT id FROM users WHERE email = $1", email)
-        if row:
-            raise HTTPException(status_code=400, detail="Email already registered")
-        await conn.execute(
-            "INSERT INTO users (email, username, name, password_hash) VALUES ($1, $2, $3, $4)",
-            email,
-            (body.username or "").strip(),
-            (body.name or "").strip(),
-            _hash_password(body.password or ""),
-        )
-    token = _create_token(email)
-    return TokenResponse(access_token=token)
-
-
-@app.post("/auth/login", response_model=TokenResponse)
-async def auth_login(body: LoginBody):
-    email = (body.email or "").strip().lower()
-    if not email:
-        raise HTTPException(status_code=401, detail="Invalid credentials")
-    pool = await db.get_pool()
-    async with pool.acquire() as conn:
-        row = await conn.fetchrow("SELECT password_hash, name FROM users WHERE email = $1", email)
-    if not row or row["password_hash"] != _hash_password(body.password or ""):
-        raise HTTPException(status_code=401, detail="Invalid credentials")
-    token = _create_token(email)
-    return TokenResponse(access_token=token)
-
-
-class MeResponse(BaseModel):
-    id: str
-    name: str
-    email: str
-
-
-@app.get("/api/me", response_model=MeResponse)
-async def api_me(authorization: str | None = Header(None, alias="Authorization")):
-    email = _require_user(authorization)
-    pool = await db.get_pool()
-    async with pool.acquire() as conn:
-        row = await conn.fetchrow("SELECT id, name, email FROM users WHERE email = $1", email)
-    if not row:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    return MeResponse(id=str(row["id"]), name=row["name"] or email, email=row["email"])
-
-
-class SightingResponse(BaseModel):
-    id: int
-    name: str
-    sci: str
-    status: str
-    lat: float
-    lng: float
-    timestamp: int
-    threat_score: int
-    reporter: str
-
-
-class UserStatsResponse(BaseModel):
-    total_sightings: int
-    endangered_species: int
-    avg_threat_score: float
-
-
-class LeaderboardEntryResponse(BaseModel):
-    rank: int
-    name: str
-    score: int
-    species: int
-    joined: str
-
-
-def _ts(created_at) -> int:
-    if created_at is None:
-        return 0
-    if hasattr(created_at, "timestamp"):
-        return int(created_at.timestamp())
-    return 0
-
-
-@app.get("/api/sightings", response_model=list[SightingResponse])
-async def list_sightings():
-    pool = await db.get_pool()
-    async with pool.acquire() as conn:
-        rows = await conn.fetch("""
-            SELECT s.id, s.name, s.sci, s.status, s.lat, s.lng, s.threat_score, s.created_at, u.name AS reporter_name
-            FROM sightings s
-            JOIN users u ON u.id = s.user_id
-            ORDER BY s.created_at DESC
-            LIMIT 500
-        """)
-    return [
-        SightingResponse(
-            id=r["id"],
-            name=r["name"],
-            sci=r["sci"],
-            status=r["status"] if r["status"] in ("CR", "EN", "VU", "NT", "LC") else "LC",
-            lat=float(r["lat"]),
-            lng=float(r["lng"]),
-            timestamp=_ts(r["created_at"]),
-            threat_score=int(r["threat_score"]),
-            reporter=r["reporter_name"] or "Unknown",
-        )
-        for r in rows
-    ]
-
-
-@app.get("/api/me/sightings", response_model=list[SightingResponse])
-async def list_my_sightings(authorization: str | None = Header(None, alias="Authorization")):
-    email = _require_user(authorization)
-    pool = await db.get_pool()
-    async with pool.acquire() as conn:
-        user_row = await conn.fetchrow("SELECT id FROM users WHERE email = $1", email)
-        if not user_row:
-            raise HTTPException(status_code=401, detail="Not authenticated")
-        uid = user_row["id"]
-        rows = await conn.fetch(
-            "SELECT s.id, s.name, s.sci, s.status, s.lat, s.lng, s.threat_score, s.created_at FROM sightings s WHERE s.user_id = $1 ORDER BY s.created_at DESC LIMIT 200",
-            uid,
-        )
-        u_name = await conn.fetchval("SELECT name FROM users WHERE id = $1", uid)
-    reporter = u_name or email
-    return [
-        SightingResponse(
-            id=r["id"],
-            name=r["name"],
-            sci=r["sci"],
-            status=r["status"] if r["status"] in ("CR", "EN", "VU", "NT", "LC") else "LC",
-            lat=float(r["lat"]),
-            lng=float(r["lng"]),
-            timestamp=_ts(r["created_at"]),
-            threat_score=int(r["threat_score"]),
-            reporter=reporter,
-        )
-        for r in rows
-    ]
-
-
-@app.get("/api/me/stats", response_model=UserStatsResponse)
-async def get_my_stats(authorization: str | None = Header(None, alias="Authorization")):
-    email = _require_user(authorization)
-    pool = await db.get_pool()
-    async with pool.acquire() as conn:
-        user_row = await conn.fetchrow("SELECT id FROM users WHERE email = $1", email)
-        if not user_row:
-            raise HTTPException(status_code=401, detail="Not authenticated")
-        uid = user_row["id"]
-        row = await conn.fetchrow("""
-            SELECT COUNT(*) AS total_sightings,
-                   COUNT(*) FILTER (WHERE s.status IN ('CR','EN','VU')) AS endangered_species,
-                   COALESCE(AVG(s.threat_score)::numeric, 0) AS avg_threat_score
-            FROM sightings s WHERE s.user_id = $1
-        """, uid)
-    return UserStatsResponse(
-        total_sightings=row["total_sightings"] or 0,
-        endangered_species=row["endangered_species"] or 0,
-        avg_threat_score=float(row["avg_threat_score"] or 0),
+
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Sign-in is busy, please retry shortly."},
+        headers={"Retry-After": str(exc.retry_after)},
     )
 
 
-class CreateSightingBody(BaseModel):
-    name: str
-    sci: str
-    status: str = "LC"
-    lat: float = 0.0
-    lng: float = 0.0
-    threat_score: int = 0
-
-
-@app.post("/api/sightings", response_model=SightingResponse)
-async def create_sighting(
-    body: CreateSightingBody,
-    authorization: str | None = Header(None, alias="Authorization"),
-):
-    email = _require_user(authorization)
-    pool = await db.get_pool()
-    async with pool.acquire() as conn:
-        user_row = await conn.fetchrow("SELECT id, name FROM users WHERE email = $1", email)
-        if not user_row:
-            raise HTTPException(status_code=401, detail="Not authenticated")
-        uid = user_row["id"]
-        status = body.status if body.status in ("CR", "EN", "VU", "NT", "LC") else "LC"
-        row = await conn.fetchrow(
-            """INSERT INTO sightings (user_id, name, sci, status, lat, lng, threat_score)
-               VALUES ($1, $2, $3, $4, $5, $6, $7) RETURNING id, name, sci, status, lat, lng, threat_score, created_at""",
-            uid, body.name, body.sci, status, body.lat, body.lng, min(100, max(0, body.threat_score)),
-        )
-    return SightingResponse(
-        id=row["id"],
-        name=row["name"],
-        sci=row["sci"],
-        status=row["status"],
-        lat=float(row["lat"]),
-        lng=float(row["lng"]),
-        timestamp=_ts(row["created_at"]),
-        threat_score=int(row["threat_score"]),
-        reporter=user_row["name"] or email,
+@app.exception_handler(ScanJobsBusy)
+async def scan_jobs_busy_handler(request: Request, exc: ScanJobsBusy):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Too many scans in progress, please retry shortly."},
+        headers={"Retry-After": str(exc.retry_after)},
     )
 
 
-@app.get("/api/leaderboard", response_model=list[LeaderboardEntryResponse])
-async def get_leaderboard():
-    pool = await db.get_pool()
-    async with pool.acquire() as conn:
-        rows = await conn.fetch("""
-            SELECT u.name, u.created_at,
-                   COUNT(s.id) AS species,
-                   COALESCE(SUM(s.threat_score), 0)::int AS score
-            FROM users u
-            LEFT JOIN sightings s ON s.user_id = u.id
-            GROUP BY u.id, u.name, u.created_at
-            HAVING COUNT(s.id) > 0
-            ORDER BY score DESC
-            LIMIT 100
-        """)
-    out = []
-    for i, r in enumerate(rows, 1):
-        joined = r["created_at"]
-        if hasattr(joined, "strftime"):
-            joined = joined.strftime("%b %Y")
-        else:
-            joined = str(joined)[:7] if joined else "—"
-        out.append(LeaderboardEntryResponse(
-            rank=i,
-            name=(r["name"] or "Observer").strip() or "Observer",
-            score=int(r["score"] or 0),
-            species=int(r["species"] or 0),
-            joined=joined,
-        ))
-    return out
-
-
-@app.on_event("startup")
-async def startup_event():
-    import sys
-    await db.init_db()
-    if _get_jwt() is None:
-        print("Auth: PyJWT not installed. Run this in the same environment:", sys.executable, "-m pip install PyJWT")
-    else:
-        print("Auth: PyJWT OK")
-    loop = asyncio.get_event_loop()
-    await loop.run_in_executor(None, get_model)
-=======
 app.include_router(auth.router)
 app.include_router(scan.router)
 app.include_router(leaderboard.router)
@@ -528,35 +147,28 @@ app.include_router(me.router)
 app.include_router(sightings.router)
 
 
-@app.on_event("startup")
-async def startup_event():
-    # Ensure OPENAI_KEY is in os.environ (dotenv can miss it; inject from file if needed)
-    if not (os.environ.get("OPENAI_KEY") or os.environ.get("OPENAI_API_KEY")):
-        key_from_file = _read_openai_key_from_file()
-        if key_from_file:
-            os.environ["OPENAI_KEY"] = key_from_file
-    # Log whether OpenAI key is available (do not log the key)
-    try:
-        key = (get_settings().openai_api_key or "").strip()
-        print("OpenAI key:", "loaded" if key else "NOT SET (set OPENAI_KEY in .env)")
-    except Exception:
-        print("OpenAI key: NOT SET")
-    conn = await get_db_conn()
-    try:
-        if get_settings().force_push_schema:
-            await force_push_schema(conn)
-        else:
-            await ensure_schema(conn)
-    finally:
-        await conn.close()
-
->>>>>>> Stashed changes
-
 @app.get("/health")
 async def health():
     return {"status": "ok"}
 
 
+@app.get("/metrics")
+async def get_metrics():
+    return metrics.snapshot()
+
+
+@app.post("/admin/reload-settings")
+async def admin_reload_settings(x_admin_token: str = Header(default="")):
+    """Same as SIGHUP, for platforms without signals. Disabled unless ADMIN_TOKEN is set."""
+    token = get_settings().admin_token
+    if not token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not hmac.compare_digest(x_admin_token.encode(), token.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+    _reload_settings()
+    return {"status": "reloaded"}
+
+
 def _read_openai_key_from_file() -> str:
     """Read OPENAI_KEY from .env next to main.py (same dir as .env)."""
     path = os.path.join(_backend_dir, ".env")
@@ -618,47 +230,16 @@ async def identify(file: UploadFile = File(...)):
         raise HTTPException(status_code=413, detail="Image must be under 10 MB.")
 
     from routers.scan import identify_species_from_image
-    from services.iucn import IUCN_LABELS, get_iucn_species
-
-<<<<<<< Updated upstream
-    parts = [p.strip() for p in raw_label.split(",")]
-    species = parts[0].title()
-    scientific_name = parts[-1] if len(parts) > 1 and len(parts[-1].split()) == 2 else species
-
-    endangerment = await get_iucn_status(scientific_name)
-    threat_score = _threat_score_from_endangerment(endangerment)
-
-    population, habitat, threats, trend, openai_quota = None, None, [], None, False
-    if OPENAI_KEY:
-        try:
-            info, openai_quota = await get_species_info_openai(species, scientific_name)
-            if info:
-                population = info.get("population") or None
-                habitat = info.get("habitat") or None
-                threats = info.get("threats") if isinstance(info.get("threats"), list) else []
-                t = (info.get("trend") or "").strip()
-                if t in ("Increasing", "Stable", "Decreasing", "Unknown"):
-                    trend = t
-                raw = info.get("threat_score")
-                if isinstance(raw, (int, float)):
-                    threat_score = min(100, max(0, int(raw)))
-        except Exception:
-            pass
-    return AnimalResult(
-        species=species,
-        endangerment=endangerment,
-        sci=scientific_name,
-        threat_score=threat_score,
-        population=population,
-        habitat=habitat,
-        threats=threats or [],
-        trend=trend,
-        openaiQuotaExceeded=openai_quota,
-    )
-=======
+    from services.enrichment import cached_iucn_species
+    from services.iucn import IUCN_LABELS, IUCNUnavailable
+
     name, sci, _ = await identify_species_from_image(image_bytes)
-    iucn = await get_iucn_species(sci)
+    try:
+        iucn = await cached_iucn_species(sci)
+    except IUCNUnavailable as e:
+        # Degrade like the scan enrichment path: identification already succeeded.
+        logger.warning("IUCN lookup for %s failed: %s", sci, e)
+        iucn = None
     raw_cat = iucn.get("category", "NE") if iucn else "NE"
     status_label = IUCN_LABELS.get(raw_cat, "Unknown")
     return AnimalResult(species=name, endangerment=status_label)
->>>>>>> Stashed changes
@@ -0,0 +1,68 @@
+import bisect
+import threading
+from typing import Callable
+
+# Upper bounds in seconds; the last bucket catches everything slower.
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram, safe to observe from worker threads."""
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)
+        self._count = 0
+        self._sum = 0.0
+        self._max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        idx = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self._counts[idx] += 1
+            self._count += 1
+            self._sum += seconds
+            if seconds > self._max:
+                self._max = seconds
+
+    def quantile(self, q: float) -> float:
+        """Approximate quantile: upper bound of the bucket containing it."""
+        with self._lock:
+            if not self._count:
+                return 0.0
+            target = q * self._count
+            seen = 0
+            for i, n in enumerate(self._counts):
+                seen += n
+                if seen >= target:
+                    return self.buckets[i] if i < len(self.buckets) else self._max
+        return self._max
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            count, total, peak = self._count, self._sum, self._max
+            buckets = {
+                (str(b) if i < len(self.buckets) else "+Inf"): n
+                for i, (b, n) in enumerate(zip((*self.buckets, None), self._counts))
+            }
+        return {
+            "count": count,
+            "avg_ms": round(total / count * 1000, 2) if count else 0.0,
+            "p50_ms": round(self.quantile(0.5) * 1000, 2),
+            "p95_ms": round(self.quantile(0.95) * 1000, 2),
+            "max_ms": round(peak * 1000, 2),
+            "buckets": buckets,
+        }
+
+
+_sources: dict[str, Callable[[], dict]] = {}
+
+
+def register(name: str, source: Callable[[], dict]) -> None:
+    """Expose a metrics source under `name` in GET /metrics."""
+    _sources[name] = source
+
+
+def snapshot() -> dict:
+    return {name: source() for name, source in _sources.items()}
@@ -0,0 +1,108 @@
+"""Keyset pagination over (created_at, id) and NDJSON streaming for sightings feeds.
+
+Pages are ordered created_at DESC, id DESC; the cursor is the last row's key,
+so the next page is an index range scan instead of an ever-growing OFFSET.
+NDJSON streams hold a connection and a read-only transaction for as long as
+the client takes to read, so at most SIGHTINGS_STREAM_CONCURRENCY run at once
+per process (always fewer than DB_POOL_MAX_SIZE).
+"""
+import base64
+import weakref
+from datetime import datetime
+from typing import AsyncIterator, Callable, Sequence
+
+from pydantic import BaseModel
+
+from config import get_settings
+from database import acquire
+
+Cursor = tuple[datetime, int]
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+_settings = get_settings()
+_stream_slots = max(1, min(_settings.sightings_stream_concurrency, _settings.db_pool_max_size - 1))
+_open_streams = 0
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(value: str) -> Cursor:
+    """Inverse of encode_cursor; raises ValueError for anything it did not produce."""
+    try:
+        raw = base64.urlsafe_b64decode(value + "=" * (-len(value) % 4)).decode()
+        created, _, row_id = raw.rpartition("|")
+        return datetime.fromisoformat(created), int(row_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def keyset_filter(cursor: Cursor | None, param: int, prefix: str = "") -> tuple[str, list]:
+    """SQL condition for rows after `cursor`, using placeholders $param and $param+1."""
+    if cursor is None:
+        return "TRUE", []
+    return f"({prefix}created_at, {prefix}id) < (${param}, ${param + 1})", list(cursor)
+
+
+def next_cursor(rows: Sequence, limit: int) -> str | None:
+    """Cursor for the page after `rows`, or None when this was the last page."""
+    if len(rows) < limit:
+        return None
+    return encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+
+
+def claim_stream() -> bool:
+    """Take a stream slot if one is free; handlers answer 503 instead of queueing.
+
+    Check and take happen without an await in between, so two requests cannot
+    both see the last slot free. The slot belongs to the next ndjson_rows().
+    """
+    global _open_streams
+    if _open_streams >= _stream_slots:
+        return False
+    _open_streams += 1
+    return True
+
+
+def _release_stream() -> None:
+    global _open_streams
+    _open_streams -= 1
+
+
+def ndjson_rows(
+    query: str,
+    args: Sequence,
+    to_model: Callable[..., BaseModel],
+    prefetch: int = 500,
+) -> AsyncIterator[str]:
+    """Serialise query rows one JSON line at a time straight off a server-side cursor.
+
+    Call after claim_stream() succeeded; the slot is given back when the stream
+    ends or fails, or when the body is dropped before it started (client gone
+    before the first chunk). Takes its own pooled connection: the response body
+    outlives the request's dependencies.
+    """
+    released = False
+
+    def release() -> None:
+        nonlocal released
+        if not released:
+            released = True
+            _release_stream()
+
+    async def rows() -> AsyncIterator[str]:
+        try:
+            async with acquire() as conn:
+                async with conn.transaction(readonly=True):
+                    async for row in conn.cursor(query, *args, prefetch=prefetch):
+                        yield to_model(row).model_dump_json() + "\n"
+        finally:
+            release()
+
+    body = rows()
+    # An async generator that never started skips its finally block when collected.
+    weakref.finalize(body, release)
+    return body
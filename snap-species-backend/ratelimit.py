@@ -0,0 +1,38 @@
+import time
+from typing import Hashable
+
+from cache import TTLCache
+
+
+class RateLimiter:
+    """Fixed-window attempt counter per key, kept in memory per worker.
+
+    hit() records an attempt and returns None while the key is under `limit`
+    for the current window, else the seconds until the window resets.
+    """
+
+    def __init__(self, limit: int, window: float, maxsize: int = 100_000) -> None:
+        self.limit = max(1, limit)
+        self.window = window
+        self.limited = 0
+        self._windows: TTLCache[tuple[float, int]] = TTLCache(maxsize=maxsize, ttl=window)
+
+    def configure(self, limit: int, window: float) -> None:
+        """Apply new settings; existing windows keep their start and run out as before."""
+        self.limit = max(1, limit)
+        self.window = window
+
+    def hit(self, key: Hashable) -> float | None:
+        now = time.monotonic()
+        started, count = self._windows.get(key) or (now, 0)
+        if count >= self.limit:
+            self.limited += 1
+            return max(0.0, started + self.window - now)
+        self._windows.set(key, (started, count + 1), ttl=started + self.window - now)
+        return None
+
+    def reset(self, key: Hashable) -> None:
+        self._windows.pop(key)
+
+    def stats(self) -> dict:
+        return {"limit": self.limit, "window_s": self.window, "tracked": len(self._windows), "limited": self.limited}
@@ -1,23 +1,38 @@
+import math
 from datetime import datetime, timedelta, timezone
 
-from fastapi import APIRouter, Depends, HTTPException
+import asyncpg
+from fastapi import APIRouter, HTTPException, Request
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 
+import metrics
 from config import get_settings
-from database import get_db_conn
+from database import acquire
+from ratelimit import RateLimiter
 from schemas import LoginRequest, SignupRequest, TokenResponse
+from services.passwords import hasher
 
 router = APIRouter(prefix="/auth", tags=["auth"])
-pwd_ctx = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+_settings = get_settings()
+_logins_by_email = RateLimiter(_settings.login_max_attempts_per_email, _settings.login_rate_window)
+_logins_by_ip = RateLimiter(_settings.login_max_attempts_per_ip, _settings.login_rate_window)
+metrics.register("login_rate_limit", lambda: {"email": _logins_by_email.stats(), "ip": _logins_by_ip.stats()})
 
-def hash_password(password: str) -> str:
-    return pwd_ctx.hash(password)
 
-
-def verify_password(plain: str, hashed: str) -> bool:
-    return pwd_ctx.verify(plain, hashed)
+def _check_login_rate(email: str, ip: str) -> None:
+    """429 before any bcrypt work when this email or client IP is over its attempt budget."""
+    settings = get_settings()
+    _logins_by_ip.configure(settings.login_max_attempts_per_ip, settings.login_rate_window)
+    _logins_by_email.configure(settings.login_max_attempts_per_email, settings.login_rate_window)
+    for limiter, key in ((_logins_by_ip, ip), (_logins_by_email, email)):
+        retry_after = limiter.hit(key)
+        if retry_after is not None:
+            raise HTTPException(
+                status_code=429,
+                detail="Too many login attempts, please try again later.",
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+            )
 
 
 def create_access_token(subject: str) -> str:
@@ -27,16 +42,12 @@ def create_access_token(subject: str) -> str:
     return jwt.encode(payload, settings.jwt_secret, algorithm=settings.jwt_algorithm)
 
 
-async def get_user_by_email(email: str) -> dict | None:
-    conn = await get_db_conn()
-    try:
-        row = await conn.fetchrow(
-            "SELECT id, email, name, password_hash FROM users WHERE email = $1",
-            email.strip().lower(),
-        )
-        return dict(row) if row else None
-    finally:
-        await conn.close()
+async def get_user_by_email(conn: asyncpg.Connection, email: str) -> dict | None:
+    row = await conn.fetchrow(
+        "SELECT id, email, name, password_hash FROM users WHERE email = $1",
+        email.strip().lower(),
+    )
+    return dict(row) if row else None
 
 
 @router.post("/signup", response_model=TokenResponse)
@@ -47,31 +58,39 @@ async def signup(body: SignupRequest):
     if len(body.password) < 6:
         raise HTTPException(status_code=400, detail="Password must be at least 6 characters.")
 
-    existing = await get_user_by_email(email)
-    if existing:
-        raise HTTPException(status_code=400, detail="An account with this email already exists.")
-
-    conn = await get_db_conn()
-    try:
-        password_hash = hash_password(body.password)
-        await conn.execute(
-            "INSERT INTO users (email, name, password_hash) VALUES ($1, $2, $3)",
+    # Hash before borrowing a connection; the unique email index decides races in one round trip.
+    password_hash = await hasher.hash(body.password)
+    async with acquire() as conn:
+        user_id = await conn.fetchval(
+            """INSERT INTO users (email, name, password_hash) VALUES ($1, $2, $3)
+               ON CONFLICT (email) DO NOTHING
+               RETURNING id""",
             email, body.name.strip(), password_hash,
         )
-        row = await conn.fetchrow("SELECT id FROM users WHERE email = $1", email)
-        user_id = row["id"]
-    finally:
-        await conn.close()
+    if user_id is None:
+        raise HTTPException(status_code=400, detail="An account with this email already exists.")
 
     token = create_access_token(str(user_id))
     return TokenResponse(access_token=token)
 
 
 @router.post("/login", response_model=TokenResponse)
-async def login(body: LoginRequest):
-    user = await get_user_by_email(body.email.strip().lower())
-    if not user or not verify_password(body.password, user["password_hash"]):
+async def login(body: LoginRequest, request: Request):
+    email = body.email.strip().lower()
+    _check_login_rate(email, request.client.host if request.client else "unknown")
+    # The connection is released before bcrypt runs, so a login storm cannot pin the pool.
+    async with acquire() as conn:
+        user = await get_user_by_email(conn, email)
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid credentials.")
+    ok, new_hash = await hasher.verify(body.password, user["password_hash"])
+    if not ok:
         raise HTTPException(status_code=401, detail="Invalid credentials.")
+    if new_hash:
+        # Hash made at a cost below BCRYPT_ROUNDS; upgrade it while we have the password.
+        async with acquire() as conn:
+            await conn.execute("UPDATE users SET password_hash = $1 WHERE id = $2", new_hash, user["id"])
+    _logins_by_email.reset(email)
 
     token = create_access_token(str(user["id"]))
     return TokenResponse(access_token=token)
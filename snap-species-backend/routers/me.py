@@ -1,25 +1,36 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.responses import StreamingResponse
 
-from database import get_db_conn
+import metrics
+from cache import TTLCache
+from config import get_settings
+from database import acquire
 from deps import get_user_name, require_user
+from pagination import NEXT_CURSOR_HEADER, claim_stream, decode_cursor, keyset_filter, ndjson_rows, next_cursor
 from schemas import SightingResponse, UserProfileResponse, UserStatsResponse
+from services.sightings import writer as sighting_writer
 
 router = APIRouter(prefix="/api", tags=["me"])
 
 
+_profiles: TTLCache[UserProfileResponse] = TTLCache(maxsize=10_000, ttl=get_settings().profile_cache_ttl)
+metrics.register("profile_cache", _profiles.stats)
+
+
 @router.get("/me", response_model=UserProfileResponse)
 async def get_me(user_id: int = Depends(require_user)):
-    conn = await get_db_conn()
-    try:
+    profile = _profiles.get(user_id)
+    if profile is not None:
+        return profile
+    async with acquire() as conn:
         row = await conn.fetchrow(
             "SELECT id, name, email FROM users WHERE id = $1", user_id
         )
-        if not row:
-            from fastapi import HTTPException
-            raise HTTPException(status_code=401, detail="User not found")
-        return UserProfileResponse(id=row["id"], name=row["name"], email=row["email"])
-    finally:
-        await conn.close()
+    if not row:
+        raise HTTPException(status_code=401, detail="User not found")
+    profile = UserProfileResponse(id=row["id"], name=row["name"], email=row["email"])
+    _profiles.set(user_id, profile, ttl=get_settings().profile_cache_ttl)
+    return profile
 
 
 def _parse_created_to_ts(created) -> int:
@@ -36,49 +47,86 @@ def _parse_created_to_ts(created) -> int:
         return 0
 
 
-@router.get("/me/sightings", response_model=list[SightingResponse])
-async def get_my_sightings(user_id: int = Depends(require_user)):
-    conn = await get_db_conn()
+def _my_sightings_query(cursor: str | None) -> tuple[str, list]:
+    """Query over $1 = user_id plus the keyset condition ($2, $3) when paging."""
     try:
-        rows = await conn.fetch("""
-            SELECT id, name, sci, status, lat, lng, threat_score, created_at
-            FROM sightings WHERE user_id = $1 ORDER BY created_at DESC LIMIT 200
-        """, user_id)
-        reporter = await get_user_name(user_id)
-        return [
-            SightingResponse(
-                id=r["id"],
-                name=r["name"],
-                sci=r["sci"],
-                status=r["status"] if r["status"] in ("CR", "EN", "VU", "NT", "LC") else "LC",
-                lat=float(r["lat"]),
-                lng=float(r["lng"]),
-                timestamp=_parse_created_to_ts(r["created_at"]),
-                threat_score=int(r["threat_score"]),
-                reporter=reporter,
-            )
-            for r in rows
-        ]
-    finally:
-        await conn.close()
+        key = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    where, args = keyset_filter(key, 2)
+    query = f"""
+        SELECT id, name, sci, status, lat, lng, threat_score, created_at
+        FROM sightings WHERE user_id = $1 AND {where}
+        ORDER BY created_at DESC, id DESC
+    """
+    return query, args
+
+
+def _my_sighting(row, reporter: str) -> SightingResponse:
+    return SightingResponse(
+        id=row["id"],
+        name=row["name"],
+        sci=row["sci"],
+        status=row["status"] if row["status"] in ("CR", "EN", "VU", "NT", "LC") else "LC",
+        lat=float(row["lat"]),
+        lng=float(row["lng"]),
+        timestamp=_parse_created_to_ts(row["created_at"]),
+        threat_score=int(row["threat_score"]),
+        reporter=reporter,
+    )
+
+
+@router.get("/me/sightings", response_model=list[SightingResponse])
+async def get_my_sightings(
+    response: Response,
+    limit: int = 200,
+    cursor: str | None = None,
+    user_id: int = Depends(require_user),
+):
+    """One page of the caller's sightings; follow X-Next-Cursor via ?cursor= for the next."""
+    # Read-your-writes after a scan. Flush before borrowing a connection: the writer needs one.
+    await sighting_writer.flush()
+    limit = max(1, min(limit, 1000))
+    query, args = _my_sightings_query(cursor)
+    async with acquire() as conn:
+        rows = await conn.fetch(query + f" LIMIT ${len(args) + 2}", user_id, *args, limit)
+        reporter = await get_user_name(conn, user_id)
+    after = next_cursor(rows, limit)
+    if after is not None:
+        response.headers[NEXT_CURSOR_HEADER] = after
+    return [_my_sighting(r, reporter) for r in rows]
+
+
+@router.get("/me/sightings/stream")
+async def stream_my_sightings(
+    cursor: str | None = None,
+    user_id: int = Depends(require_user),
+):
+    """All of the caller's sightings as NDJSON, newest first."""
+    query, args = _my_sightings_query(cursor)
+    async with acquire() as conn:
+        reporter = await get_user_name(conn, user_id)
+    # Claimed last, so nothing between here and the response can leak the slot.
+    if not claim_stream():
+        raise HTTPException(status_code=503, detail="Too many exports in progress.", headers={"Retry-After": "5"})
+    return StreamingResponse(
+        ndjson_rows(query, [user_id, *args], lambda row: _my_sighting(row, reporter)),
+        media_type="application/x-ndjson",
+    )
 
 
 @router.get("/me/stats", response_model=UserStatsResponse)
 async def get_my_stats(user_id: int = Depends(require_user)):
-    conn = await get_db_conn()
-    try:
-        row = await conn.fetchrow("""
-            SELECT
-                COUNT(*) AS total_sightings,
-                COUNT(DISTINCT CASE WHEN status IN ('CR', 'EN', 'VU') THEN LOWER(TRIM(sci)) END) AS endangered_species,
-                COALESCE(AVG(threat_score), 0) AS avg_threat_score
-            FROM sightings
-            WHERE user_id = $1
-        """, user_id)
-        return UserStatsResponse(
-            endangered_species=int(row["endangered_species"] or 0),
-            total_sightings=int(row["total_sightings"] or 0),
-            avg_threat_score=round(float(row["avg_threat_score"] or 0), 1),
+    await sighting_writer.flush()
+    # Maintained on insert by services.user_stats; no row yet means no sightings.
+    async with acquire() as conn:
+        row = await conn.fetchrow(
+            "SELECT sightings, endangered_species, avg_threat_score FROM user_stats WHERE user_id = $1", user_id
         )
-    finally:
-        await conn.close()
+    if row is None:
+        return UserStatsResponse(endangered_species=0, total_sightings=0, avg_threat_score=0.0)
+    return UserStatsResponse(
+        endangered_species=int(row["endangered_species"]),
+        total_sightings=int(row["sightings"]),
+        avg_threat_score=round(float(row["avg_threat_score"]), 1),
+    )
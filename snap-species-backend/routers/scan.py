@@ -1,27 +1,41 @@
 import asyncio
+import json
 import logging
-from typing import Annotated
+from typing import Annotated, Any, Callable
 
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
+import numpy as np
+from fastapi import APIRouter, Depends, File, Form, Header, HTTPException, Response, UploadFile
+from fastapi.responses import StreamingResponse
 
-from config import get_openai_key as config_get_openai_key, get_settings
-from database import get_db_conn
+from config import get_settings
+from database import acquire
 from deps import get_current_user_id
-from schemas import ScanResultResponse, SpeciesIdentificationResponse
+from geo import EARTH_RADIUS_KM, bounding_box
+from schemas import (
+    BatchScanImageResult,
+    BatchScanResponse,
+    ScanJobIucnResponse,
+    ScanJobResponse,
+    ScanResultResponse,
+    SpeciesIdentificationResponse,
+)
+from services import image_cache
+from services.image_cache import Identification
 from services.animal_detect import detect_species as animal_detect_species
-from services.classification import run_mobilenet
+from services.enrichment import enrich_species
+from services.executor import ExecutorSaturated, inference_executor
+from services.classification import classify_crops, prepare
+from services.inference import classify_image
+from services.scan_jobs import ScanJob, jobs as scan_jobs
+from services.sightings import NewSighting, writer as sighting_writer
 from services.iucn import (
     ENDANGERED_STATUSES,
     IUCN_LABELS,
     endangerment_score,
     endangerment_status,
-    get_iucn_habitats,
-    get_iucn_species,
-    get_iucn_threats,
     population_from_result,
     population_trend_from_result,
 )
-from services.openai_species import fetch_species_info_openai
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api", tags=["scan"])
@@ -36,16 +50,99 @@ def _species_from_label(raw_label: str) -> tuple[str, str]:
     return name, sci
 
 
-async def identify_species_from_image(image_bytes: bytes) -> tuple[str, str, float]:
+def _prepare(image_bytes: bytes, with_hash: bool) -> tuple[np.ndarray, int | None]:
+    """Decode once to the model crop, plus its dHash when the near-duplicate cache is on."""
+    crop = prepare(image_bytes)
+    return crop, image_cache.perceptual_hash(crop) if with_hash else None
+
+
+async def _identify_uncached(image_bytes: bytes, crop: np.ndarray | None) -> Identification:
     result = await animal_detect_species(image_bytes)
     if result:
         return result
-    loop = asyncio.get_event_loop()
-    raw_label, confidence = await loop.run_in_executor(None, run_mobilenet, image_bytes)
+    raw_label, confidence = await classify_image(crop if crop is not None else image_bytes)
     name, sci = _species_from_label(raw_label)
     return name, sci, confidence
 
 
+async def _lookup_cached(image_bytes: bytes) -> tuple[str, int | None, np.ndarray | None, Identification | None]:
+    """(digest, phash, model crop, cached identification or None) for an upload.
+
+    With the near-duplicate cache on, the image is decoded here (admitted like
+    any inference work) and the crop is handed on to the classifier.
+    """
+    digest = await asyncio.to_thread(image_cache.content_digest, image_bytes)
+    cached = image_cache.get_exact(digest)
+    if cached:
+        return digest, None, None, cached
+    crop = phash = None
+    if get_settings().image_cache_phash:
+        try:
+            async with inference_executor.admit():
+                crop, phash = await inference_executor.run(_prepare, image_bytes, True)
+        except ExecutorSaturated:
+            raise
+        except Exception:
+            crop = phash = None  # undecodable; let the classifier report the error
+        if phash is not None:
+            near = image_cache.get_near(phash)
+            if near:
+                image_cache.put(digest, phash, near)
+                return digest, phash, crop, near
+    image_cache.record_miss()
+    return digest, phash, crop, None
+
+
+async def identify_species_from_image(image_bytes: bytes) -> Identification:
+    digest, phash, crop, cached = await _lookup_cached(image_bytes)
+    if cached:
+        return cached
+    result = await _identify_uncached(image_bytes, crop)
+    image_cache.put(digest, phash, result)
+    return result
+
+
+async def identify_species_from_images(images: list[bytes]) -> list[Identification | Exception]:
+    """Identify a burst: exact cache hits first, then one decode per remaining frame
+    (near-duplicate lookup on its dHash) and one MobileNet batch for the rest.
+
+    Everything past the exact-hash check is admitted as one unit, so a burst
+    either fits in INFERENCE_MAX_PENDING or gets ExecutorSaturated up front.
+    AnimalDetect is not consulted here; it is one upstream call per image,
+    which is what a burst endpoint exists to avoid.
+    """
+    digests = await asyncio.to_thread(lambda: [image_cache.content_digest(img) for img in images])
+    results: list[Identification | Exception | None] = [image_cache.get_exact(d) for d in digests]
+    todo = [i for i, cached in enumerate(results) if cached is None]
+    if not todo:
+        return results
+    with_hash = get_settings().image_cache_phash
+    async with inference_executor.admit(len(todo)):
+        prepared = await asyncio.gather(
+            *(inference_executor.run(_prepare, images[i], with_hash) for i in todo), return_exceptions=True
+        )
+        misses: list[tuple[int, np.ndarray, int | None]] = []
+        for i, outcome in zip(todo, prepared):
+            if isinstance(outcome, Exception):
+                results[i] = outcome
+                continue
+            crop, phash = outcome
+            near = image_cache.get_near(phash) if phash is not None else None
+            if near:
+                image_cache.put(digests[i], phash, near)
+                results[i] = near
+                continue
+            image_cache.record_miss()
+            misses.append((i, crop, phash))
+        if misses:
+            labels = await inference_executor.run(classify_crops, [crop for _, crop, _ in misses])
+            for (i, _, phash), (raw_label, confidence) in zip(misses, labels):
+                name, sci = _species_from_label(raw_label)
+                results[i] = (name, sci, confidence)
+                image_cache.put(digests[i], phash, results[i])
+    return results
+
+
 @router.post("/species", response_model=SpeciesIdentificationResponse)
 async def species_from_image(image: UploadFile = File(...)):
     if image.content_type not in {"image/jpeg", "image/png", "image/webp"}:
@@ -55,11 +152,36 @@ async def species_from_image(image: UploadFile = File(...)):
         raise HTTPException(status_code=413, detail="Image must be under 10 MB.")
     try:
         name, sci, confidence = await identify_species_from_image(image_bytes)
+    except ExecutorSaturated:
+        raise
     except Exception as e:
         raise HTTPException(status_code=422, detail=f"Could not process image: {e}")
     return SpeciesIdentificationResponse(name=name, sci=sci, confidence=round(confidence, 1))
 
 
+async def _count_species_sightings(name: str, sci: str, lat: float | None, lng: float | None) -> int:
+    """Sightings of the same species within NEARBY_RADIUS_KM, or anywhere if no location was sent."""
+    sci_key, name_key = sci.strip().lower(), name.strip().lower()
+    async with acquire() as conn:
+        if lat is None or lng is None:
+            return await conn.fetchval(
+                "SELECT COUNT(*) FROM sightings WHERE LOWER(TRIM(sci)) = $1 OR LOWER(TRIM(name)) = $2",
+                sci_key, name_key,
+            )
+        radius = get_settings().nearby_radius_km
+        min_lng, min_lat, max_lng, max_lat = bounding_box(lat, lng, radius)
+        return await conn.fetchval(
+            """SELECT COUNT(*) FROM sightings
+               WHERE (LOWER(TRIM(sci)) = $1 OR LOWER(TRIM(name)) = $2)
+                 AND point(lng, lat) <@ box(point($3, $4), point($5, $6))
+                 AND 2 * $9::float8 * asin(sqrt(
+                       sin(radians(lat - $7) / 2) ^ 2
+                       + cos(radians($7)) * cos(radians(lat)) * sin(radians(lng - $8) / 2) ^ 2
+                     )) <= $10""",
+            sci_key, name_key, min_lng, min_lat, max_lng, max_lat, lat, lng, EARTH_RADIUS_KM, radius,
+        )
+
+
 def _parse_float(s: str | None) -> float | None:
     if s is None or not str(s).strip():
         return None
@@ -69,43 +191,64 @@ def _parse_float(s: str | None) -> float | None:
         return None
 
 
-@router.post("/scan", response_model=ScanResultResponse)
-async def scan(
-    image: UploadFile = File(...),
-    lat: Annotated[str | None, Form()] = None,
-    lng: Annotated[str | None, Form()] = None,
-    user_id: int | None = Depends(get_current_user_id),
-):
-    lat_f = _parse_float(lat)
-    lng_f = _parse_float(lng)
-    if image.content_type not in {"image/jpeg", "image/png", "image/webp"}:
-        raise HTTPException(status_code=415, detail="Use JPEG, PNG, or WebP.")
-    image_bytes = await image.read()
-    if len(image_bytes) > 10 * 1024 * 1024:
-        raise HTTPException(status_code=413, detail="Image must be under 10 MB.")
-
-    name, sci, confidence = await identify_species_from_image(image_bytes)
-
-    # Key from config (env + .env file, multiple paths)
-    openai_key = (get_settings().openai_api_key or config_get_openai_key() or "").strip()
+async def _enrich(
+    name: str, sci: str, lat: float | None, lng: float | None, on_result: Callable[[str, Any], None] | None = None
+) -> dict:
+    # Key from config (env + .env file, multiple paths), read once at startup
+    openai_key = get_settings().openai_api_key
     if not openai_key:
         logger.info("OpenAI key missing: population/habitat/trend/threats/description will be Unknown. Set OPENAI_KEY or OPENAI_API_KEY in snap-species-backend/.env")
-    openai_info = await fetch_species_info_openai(name, sci, api_key=openai_key or None)
+    return await enrich_species(
+        name,
+        sci,
+        openai_key=openai_key or None,
+        timeout=get_settings().scan_enrichment_deadline,
+        extra={"nearby": _count_species_sightings(name, sci, lat, lng)},
+        extra_defaults={"nearby": 0},
+        on_result=on_result,
+    )
+
+
+async def _save_sighting(user_id: int, result: ScanResultResponse, lat: float | None, lng: float | None) -> None:
+    # Write-behind: the response does not wait for the INSERT (see services/sightings.py).
+    await sighting_writer.enqueue(NewSighting(
+        user_id,
+        result.name,
+        result.sci,
+        result.status,
+        lat if lat is not None else 0.0,
+        lng if lng is not None else 0.0,
+        result.threatScore,
+    ))
+
+
+def _iucn_category(iucn_result: dict) -> str:
+    raw_cat = (iucn_result.get("category") or iucn_result.get("code") or "NE")
+    if isinstance(raw_cat, str):
+        return raw_cat.strip().upper()[:2]
+    return "NE"
+
+
+def _endangerment(status: str) -> tuple[bool, str]:
+    """(isEndangered, endangermentLabel) for an IUCN status."""
+    is_endangered = status in ENDANGERED_STATUSES
+    return is_endangered, IUCN_LABELS.get(status, "Not endangered") if is_endangered else "Not endangered"
+
+
+def _scan_result(name: str, sci: str, confidence: float, enriched: dict, saved: bool) -> ScanResultResponse:
+    """Merge OpenAI and IUCN enrichment (see services.enrichment.enrich_species) into a scan result."""
+    openai_info = enriched["openai"]
     population = openai_info.get("population") or "Unknown"
     habitat = openai_info.get("habitat") or "Unknown"
     trend = openai_info.get("trend") or "Unknown"
     threats = list(openai_info.get("threats") or [])
     description = (openai_info.get("description") or "").strip()
 
-    iucn_result = await get_iucn_species(sci)
+    iucn_result = enriched["iucn"]
     threats_from_api: list[str] = []
 
     if iucn_result:
-        raw_cat = (iucn_result.get("category") or iucn_result.get("code") or "NE")
-        if isinstance(raw_cat, str):
-            raw_cat = raw_cat.strip().upper()[:2]
-        else:
-            raw_cat = "NE"
+        raw_cat = _iucn_category(iucn_result)
         status = endangerment_status(raw_cat)
         threat_score = endangerment_score(raw_cat)
         if not trend or trend == "Unknown":
@@ -134,49 +277,16 @@ async def scan(
             habitat = "Unknown"
 
     if not threats and not threats_from_api:
-        threats_from_api = await get_iucn_threats(sci)
+        threats_from_api = enriched["threats"]
     if threats_from_api and not threats:
         threats = threats_from_api
     if not habitat or habitat == "Unknown":
-        habs = await get_iucn_habitats(sci)
+        habs = enriched["habitats"]
         if habs:
             habitat = ", ".join(habs[:5])
 
     # Threat score and status come only from IUCN category (never from OpenAI).
-    is_endangered = status in ENDANGERED_STATUSES
-    endangerment_label = (
-        IUCN_LABELS.get(status, "Not endangered")
-        if is_endangered
-        else "Not endangered"
-    )
-
-    nearby = 0
-    conn = await get_db_conn()
-    try:
-        row = await conn.fetchrow(
-            "SELECT COUNT(*) AS n FROM sightings WHERE LOWER(sci) = LOWER($1) OR LOWER(name) = LOWER($2)",
-            sci, name,
-        )
-        nearby = row["n"] if row else 0
-    finally:
-        await conn.close()
-
-    if user_id is not None:
-        conn = await get_db_conn()
-        try:
-            await conn.execute(
-                """INSERT INTO sightings (user_id, name, sci, status, lat, lng, threat_score)
-                   VALUES ($1, $2, $3, $4, $5, $6, $7)""",
-                user_id,
-                name,
-                sci,
-                status,
-                lat_f if lat_f is not None else 0.0,
-                lng_f if lng_f is not None else 0.0,
-                threat_score,
-            )
-        finally:
-            await conn.close()
+    is_endangered, endangerment_label = _endangerment(status)
 
     return ScanResultResponse(
         name=name,
@@ -189,9 +299,188 @@ async def scan(
         threatScore=threat_score,
         habitat=habitat,
         threats=threats[:10],
-        nearbySightings=nearby,
+        nearbySightings=enriched["nearby"],
         isEndangered=is_endangered,
         description=description,
-        savedToMap=user_id is not None,
+        savedToMap=saved,
         openaiQuotaExceeded=bool(openai_info.get("_quota_exceeded")),
     )
+
+
+@router.post("/scan", response_model=ScanResultResponse)
+async def scan(
+    image: UploadFile = File(...),
+    lat: Annotated[str | None, Form()] = None,
+    lng: Annotated[str | None, Form()] = None,
+    user_id: int | None = Depends(get_current_user_id),
+):
+    lat_f = _parse_float(lat)
+    lng_f = _parse_float(lng)
+    if image.content_type not in {"image/jpeg", "image/png", "image/webp"}:
+        raise HTTPException(status_code=415, detail="Use JPEG, PNG, or WebP.")
+    image_bytes = await image.read()
+    if len(image_bytes) > 10 * 1024 * 1024:
+        raise HTTPException(status_code=413, detail="Image must be under 10 MB.")
+
+    name, sci, confidence = await identify_species_from_image(image_bytes)
+
+    enriched = await _enrich(name, sci, lat_f, lng_f)
+    result = _scan_result(name, sci, confidence, enriched, saved=user_id is not None)
+    if user_id is not None:
+        await _save_sighting(user_id, result, lat_f, lng_f)
+    return result
+
+
+@router.post("/scan/batch", response_model=BatchScanResponse)
+async def scan_batch(
+    images: list[UploadFile] = File(...),
+    lat: Annotated[str | None, Form()] = None,
+    lng: Annotated[str | None, Form()] = None,
+    user_id: int | None = Depends(get_current_user_id),
+):
+    """Scan a burst of images taken at one place.
+
+    Uncached images are classified in one batched forward pass, and each
+    distinct species is enriched once however many frames show it. Frames
+    that cannot be read get an error entry instead of failing the request.
+    When signed in, one sighting is saved per distinct species.
+    """
+    max_images = get_settings().scan_batch_max_images
+    if len(images) > max_images:
+        raise HTTPException(status_code=413, detail=f"At most {max_images} images per batch.")
+    lat_f = _parse_float(lat)
+    lng_f = _parse_float(lng)
+
+    entries = [BatchScanImageResult(index=i, filename=image.filename) for i, image in enumerate(images)]
+    readable: list[int] = []
+    payloads: list[bytes] = []
+    for entry, image in zip(entries, images):
+        if image.content_type not in {"image/jpeg", "image/png", "image/webp"}:
+            entry.error = "Use JPEG, PNG, or WebP."
+            continue
+        image_bytes = await image.read()
+        if len(image_bytes) > 10 * 1024 * 1024:
+            entry.error = "Image must be under 10 MB."
+            continue
+        readable.append(entry.index)
+        payloads.append(image_bytes)
+
+    identified = await identify_species_from_images(payloads) if payloads else []
+    by_species: dict[tuple[str, str], list[tuple[int, float]]] = {}
+    for i, outcome in zip(readable, identified):
+        if isinstance(outcome, Exception):
+            entries[i].error = f"Could not process image: {outcome}"
+            continue
+        name, sci, confidence = outcome
+        by_species.setdefault((name, sci), []).append((i, confidence))
+
+    species = list(by_species)
+    enrichments = await asyncio.gather(*(_enrich(name, sci, lat_f, lng_f) for name, sci in species))
+    saved = user_id is not None
+    for (name, sci), enriched in zip(species, enrichments):
+        frames = by_species[(name, sci)]
+        for i, confidence in frames:
+            entries[i].result = _scan_result(name, sci, confidence, enriched, saved=saved)
+        if saved:
+            best = max(frames, key=lambda f: f[1])[0]
+            await _save_sighting(user_id, entries[best].result, lat_f, lng_f)
+    return BatchScanResponse(results=entries, species=len(species))
+
+
+async def _run_scan_job(
+    job: ScanJob, image_bytes: bytes, lat: float | None, lng: float | None, user_id: int | None
+) -> None:
+    """The /api/scan pipeline, publishing species, then IUCN status, then the full result."""
+    name, sci, confidence = await identify_species_from_image(image_bytes)
+    job.publish("species", SpeciesIdentificationResponse(name=name, sci=sci, confidence=round(confidence, 1)).model_dump())
+
+    def on_result(call: str, value: Any) -> None:
+        if call != "iucn":
+            return
+        # Without an IUCN entry the score falls back to OpenAI's estimate, which comes with the result.
+        category = _iucn_category(value) if value else None
+        status = endangerment_status(category) if category else "LC"
+        is_endangered, label = _endangerment(status)
+        job.publish("iucn", ScanJobIucnResponse(
+            status=status,
+            endangermentLabel=label,
+            isEndangered=is_endangered,
+            threatScore=endangerment_score(category) if category else None,
+        ).model_dump())
+
+    enriched = await _enrich(name, sci, lat, lng, on_result=on_result)
+    result = _scan_result(name, sci, confidence, enriched, saved=user_id is not None)
+    if user_id is not None:
+        await _save_sighting(user_id, result, lat, lng)
+    job.publish("result", result.model_dump())
+
+
+def _job_response(job: ScanJob) -> ScanJobResponse:
+    error = job.latest("error")
+    return ScanJobResponse(
+        id=job.id,
+        state=job.state,
+        species=job.latest("species"),
+        iucn=job.latest("iucn"),
+        result=job.latest("result"),
+        error=error["detail"] if error else None,
+    )
+
+
+def _get_job(job_id: str) -> ScanJob:
+    # The id is 128 random bits and acts as the capability, so EventSource
+    # (which cannot send an Authorization header) can follow signed-in jobs.
+    job = scan_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Scan job not found or expired.")
+    return job
+
+
+@router.post("/scan/jobs", response_model=ScanJobResponse, status_code=202)
+async def submit_scan_job(
+    response: Response,
+    image: UploadFile = File(...),
+    lat: Annotated[str | None, Form()] = None,
+    lng: Annotated[str | None, Form()] = None,
+    user_id: int | None = Depends(get_current_user_id),
+):
+    """Start a scan in the background and return its job id at once.
+
+    Poll GET /api/scan/jobs/{id} or follow GET /api/scan/jobs/{id}/events.
+    """
+    lat_f = _parse_float(lat)
+    lng_f = _parse_float(lng)
+    if image.content_type not in {"image/jpeg", "image/png", "image/webp"}:
+        raise HTTPException(status_code=415, detail="Use JPEG, PNG, or WebP.")
+    image_bytes = await image.read()
+    if len(image_bytes) > 10 * 1024 * 1024:
+        raise HTTPException(status_code=413, detail="Image must be under 10 MB.")
+    job = scan_jobs.submit(user_id, lambda job: _run_scan_job(job, image_bytes, lat_f, lng_f, user_id))
+    response.headers["Location"] = f"/api/scan/jobs/{job.id}"
+    return _job_response(job)
+
+
+@router.get("/scan/jobs/{job_id}", response_model=ScanJobResponse)
+async def get_scan_job(job_id: str):
+    return _job_response(_get_job(job_id))
+
+
+@router.get("/scan/jobs/{job_id}/events")
+async def scan_job_events(job_id: str, last_event_id: Annotated[str | None, Header()] = None):
+    """Server-Sent Events: species, iucn, then result (or error). Reconnects resume after Last-Event-ID."""
+    job = _get_job(job_id)
+    since = int(last_event_id) + 1 if last_event_id and last_event_id.isdigit() else 0
+
+    async def stream():
+        async for item in job.follow(since):
+            if item is None:
+                yield ": keep-alive\n\n"
+                continue
+            index, event, data = item
+            yield f"id: {index}\nevent: {event}\ndata: {json.dumps(data)}\n\n"
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,8 +1,24 @@
-from fastapi import APIRouter
+import asyncio
 
-from database import get_db_conn
-from deps import get_user_name
-from schemas import SightingResponse
+import asyncpg
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+
+from config import get_settings
+from database import acquire, get_connection
+from deps import cache_user_name, get_user_name, require_user
+from geo import MAX_ZOOM, parse_bbox, tiles_for_bbox, zoom_for_bbox
+from pagination import NEXT_CURSOR_HEADER, claim_stream, decode_cursor, keyset_filter, ndjson_rows, next_cursor
+from schemas import (
+    BulkSightingError,
+    BulkSightingsResponse,
+    CreateSightingRequest,
+    SightingClusterResponse,
+    SightingResponse,
+    SightingsViewportResponse,
+)
+from services import bulk_sightings, map_tiles
+from services.sightings import insert_sighting
 
 router = APIRouter(prefix="/api", tags=["sightings"])
 
@@ -22,30 +38,195 @@ def _parse_created_to_ts(created) -> int:
         return 0
 
 
-@router.get("/sightings", response_model=list[SightingResponse])
-async def list_sightings(limit: int = 500):
-    conn = await get_db_conn()
+def _sighting_from_row(row) -> SightingResponse:
+    reporter = row["reporter"]
+    if reporter is None:
+        reporter = "Unknown"
+    else:
+        cache_user_name(row["user_id"], reporter)
+    return SightingResponse(
+        id=row["id"],
+        name=row["name"],
+        sci=row["sci"],
+        status=row["status"] if row["status"] in ("CR", "EN", "VU", "NT", "LC") else "LC",
+        lat=float(row["lat"]),
+        lng=float(row["lng"]),
+        timestamp=_parse_created_to_ts(row["created_at"]),
+        threat_score=int(row["threat_score"]),
+        reporter=reporter,
+    )
+
+
+async def _viewport(bbox: str, zoom: int | None) -> SightingsViewportResponse:
+    try:
+        box = parse_bbox(bbox)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid bbox: {e}")
+    z = max(0, min(MAX_ZOOM, zoom if zoom is not None else zoom_for_bbox(box)))
+    tiles = tiles_for_bbox(box, z)
+    while len(tiles) > get_settings().map_max_tiles and z > 0:
+        z -= 1
+        tiles = tiles_for_bbox(box, z)
+    results = await asyncio.gather(*(map_tiles.get_tile(z, x, y) for x, y in tiles))
+
+    min_lng, min_lat, max_lng, max_lat = box
+
+    def visible(item: dict) -> bool:
+        return min_lng <= item["lng"] <= max_lng and min_lat <= item["lat"] <= max_lat
+
+    if map_tiles.is_clustered(z):
+        clusters = [SightingClusterResponse(**c) for tile in results for c in tile if visible(c)]
+        return SightingsViewportResponse(zoom=z, clustered=True, clusters=clusters)
+    seen: set[int] = set()
+    points = []
+    for tile in results:
+        for row in tile:
+            # a point exactly on a tile edge is returned by both neighbours
+            if row["id"] not in seen and visible(row):
+                seen.add(row["id"])
+                points.append(_sighting_from_row(row))
+    return SightingsViewportResponse(zoom=z, clustered=False, points=points)
+
+
+_FEED_QUERY = """
+    SELECT s.id, s.user_id, s.name, s.sci, s.status, s.lat, s.lng, s.threat_score, s.created_at,
+           u.name AS reporter
+    FROM sightings s
+    LEFT JOIN users u ON u.id = s.user_id
+    WHERE {where}
+    ORDER BY s.created_at DESC, s.id DESC
+"""
+
+
+def _feed_query(cursor: str | None, first_param: int) -> tuple[str, list]:
+    try:
+        key = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    where, args = keyset_filter(key, first_param, prefix="s.")
+    return _FEED_QUERY.format(where=where), args
+
+
+@router.get("/sightings", response_model=list[SightingResponse] | SightingsViewportResponse)
+async def list_sightings(
+    response: Response,
+    limit: int = 500,
+    cursor: str | None = None,
+    bbox: str | None = None,
+    zoom: int | None = None,
+):
+    """Newest sightings, or with ?bbox=minLng,minLat,maxLng,maxLat only those in view
+    (clustered per tile at low zoom).
+
+    The list is paged by keyset: pass the X-Next-Cursor header of one page as
+    ?cursor= for the next; the header is absent on the last page.
+    """
+    if bbox is not None:
+        # No connection held here: each tile query borrows its own (see services/map_tiles.py).
+        return await _viewport(bbox, zoom)
+    limit = max(1, min(limit, 1000))
+    query, args = _feed_query(cursor, 2)
+    async with acquire() as conn:
+        rows = await conn.fetch(query + " LIMIT $1", limit, *args)
+    after = next_cursor(rows, limit)
+    if after is not None:
+        response.headers[NEXT_CURSOR_HEADER] = after
+    return [_sighting_from_row(row) for row in rows]
+
+
+@router.get("/sightings/stream")
+async def stream_sightings(
+    cursor: str | None = None,
+    limit: int | None = None,
+    user_id: int = Depends(require_user),
+):
+    """Sightings newest first (optionally after `cursor`) as NDJSON, without buffering.
+
+    Signed-in only, and at most SIGHTINGS_STREAM_MAX_ROWS rows per call.
+    """
+    max_rows = get_settings().sightings_stream_max_rows
+    query, args = _feed_query(cursor, 1)
+    query += f" LIMIT ${len(args) + 1}"
+    args.append(max(1, min(limit or max_rows, max_rows)))
+    if not claim_stream():
+        raise HTTPException(status_code=503, detail="Too many exports in progress.", headers={"Retry-After": "5"})
+    return StreamingResponse(ndjson_rows(query, args, _sighting_from_row), media_type="application/x-ndjson")
+
+
+@router.get("/sightings/tiles/{z}/{x}/{y}", response_model=SightingsViewportResponse)
+async def get_sightings_tile(z: int, x: int, y: int, response: Response):
+    """One map tile, for clients that fetch and cache tiles themselves."""
+    if not (0 <= z <= MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise HTTPException(status_code=404, detail="No such tile")
+    data = await map_tiles.get_tile(z, x, y)
+    response.headers["Cache-Control"] = f"public, max-age={int(get_settings().map_tile_cache_ttl)}"
+    if map_tiles.is_clustered(z):
+        return SightingsViewportResponse(zoom=z, clustered=True, clusters=[SightingClusterResponse(**c) for c in data])
+    return SightingsViewportResponse(zoom=z, clustered=False, points=[_sighting_from_row(row) for row in data])
+
+
+@router.post("/sightings", response_model=SightingResponse)
+async def create_sighting(
+    body: CreateSightingRequest,
+    user_id: int = Depends(require_user),
+    conn: asyncpg.Connection = Depends(get_connection),
+):
+    status = body.status if body.status in ("CR", "EN", "VU", "NT", "LC") else "LC"
+    row = await insert_sighting(
+        conn, user_id, body.name, body.sci, status, body.lat, body.lng, min(100, max(0, body.threat_score)),
+    )
+    return SightingResponse(
+        id=row["id"],
+        name=row["name"],
+        sci=row["sci"],
+        status=row["status"],
+        lat=float(row["lat"]),
+        lng=float(row["lng"]),
+        timestamp=_parse_created_to_ts(row["created_at"]),
+        threat_score=int(row["threat_score"]),
+        reporter=await get_user_name(conn, user_id),
+    )
+
+
+@router.post("/sightings/bulk", response_model=BulkSightingsResponse)
+async def create_sightings_bulk(
+    request: Request,
+    user_id: int = Depends(require_user),
+):
+    """Upload many offline sightings at once as a JSON array, NDJSON or CSV.
+
+    Fields per row: name, sci, status (default LC), lat, lng, threat_score
+    (default 0) and optional timestamp (Unix seconds or ISO-8601, capture
+    time). Invalid rows are skipped and listed; the valid ones are written in
+    one transaction.
+    """
+    settings = get_settings()
+    max_bytes = settings.bulk_sightings_max_bytes
+    declared = request.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > max_bytes:
+        raise HTTPException(status_code=413, detail="Upload is too large.")
+    # Chunked uploads have no Content-Length; stop reading once past the limit.
+    chunks, size = [], 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > max_bytes:
+            raise HTTPException(status_code=413, detail="Upload is too large.")
+        chunks.append(chunk)
+    body = b"".join(chunks)
     try:
-        rows = await conn.fetch("""
-            SELECT s.id, s.user_id, s.name, s.sci, s.status, s.lat, s.lng, s.threat_score, s.created_at
-            FROM sightings s
-            ORDER BY s.created_at DESC
-            LIMIT $1
-        """, max(1, min(limit, 1000)))
-        out = []
-        for row in rows:
-            reporter = await get_user_name(row["user_id"])
-            out.append(SightingResponse(
-                id=row["id"],
-                name=row["name"],
-                sci=row["sci"],
-                status=row["status"] if row["status"] in ("CR", "EN", "VU", "NT", "LC") else "LC",
-                lat=float(row["lat"]),
-                lng=float(row["lng"]),
-                timestamp=_parse_created_to_ts(row["created_at"]),
-                threat_score=int(row["threat_score"]),
-                reporter=reporter,
-            ))
-        return out
-    finally:
-        await conn.close()
+        rows = await asyncio.to_thread(bulk_sightings.parse_upload, body, request.headers.get("content-type", ""))
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Could not parse upload: {e}")
+    if not rows:
+        raise HTTPException(status_code=400, detail="No sightings in upload.")
+    if len(rows) > settings.bulk_sightings_max_rows:
+        raise HTTPException(status_code=413, detail=f"At most {settings.bulk_sightings_max_rows} sightings per upload.")
+
+    columns, errors = await asyncio.to_thread(bulk_sightings.validate, rows)
+    async with acquire() as conn:
+        inserted = await bulk_sightings.write(conn, user_id, columns)
+    return BulkSightingsResponse(
+        inserted=inserted,
+        rejected=len(errors),
+        errors=[BulkSightingError(**e) for e in errors[:100]],
+    )
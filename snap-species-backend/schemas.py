@@ -48,6 +48,34 @@ class ScanResultResponse(BaseModel):
     openaiQuotaExceeded: bool = False
 
 
+class ScanJobIucnResponse(BaseModel):
+    status: Literal["CR", "EN", "VU", "NT", "LC"]
+    endangermentLabel: str
+    isEndangered: bool
+    threatScore: int | None = None
+
+
+class ScanJobResponse(BaseModel):
+    id: str
+    state: Literal["queued", "running", "done", "failed"]
+    species: SpeciesIdentificationResponse | None = None
+    iucn: ScanJobIucnResponse | None = None
+    result: ScanResultResponse | None = None
+    error: str | None = None
+
+
+class BatchScanImageResult(BaseModel):
+    index: int
+    filename: str | None = None
+    result: ScanResultResponse | None = None
+    error: str | None = None
+
+
+class BatchScanResponse(BaseModel):
+    results: list[BatchScanImageResult]
+    species: int
+
+
 class SightingResponse(BaseModel):
     id: int
     name: str
@@ -60,6 +88,42 @@ class SightingResponse(BaseModel):
     reporter: str
 
 
+class SightingClusterResponse(BaseModel):
+    lat: float
+    lng: float
+    count: int
+    endangered: int
+    max_threat_score: int
+    tile: str
+
+
+class SightingsViewportResponse(BaseModel):
+    zoom: int
+    clustered: bool
+    points: list[SightingResponse] = []
+    clusters: list[SightingClusterResponse] = []
+
+
+class CreateSightingRequest(BaseModel):
+    name: str
+    sci: str
+    status: str = "LC"
+    lat: float = 0.0
+    lng: float = 0.0
+    threat_score: int = 0
+
+
+class BulkSightingError(BaseModel):
+    row: int  # 0-based index in the upload
+    error: str
+
+
+class BulkSightingsResponse(BaseModel):
+    inserted: int
+    rejected: int
+    errors: list[BulkSightingError] = []  # first 100
+
+
 class LeaderboardEntryResponse(BaseModel):
     rank: int
     name: str
@@ -70,6 +134,13 @@ class LeaderboardEntryResponse(BaseModel):
     joined: str
 
 
+class LeaderboardRankResponse(BaseModel):
+    window: Literal["all", "month", "week"]
+    rank: int  # 0 when the user has no sightings in the window
+    total: int
+    entry: LeaderboardEntryResponse | None = None
+
+
 class UserStatsResponse(BaseModel):
     endangered_species: int
     total_sightings: int
@@ -0,0 +1,52 @@
+"""Per-request auth overhead: full JWT verification vs the verified-token cache.
+
+"before" rebuilds Settings and runs jose's decode on every call, as
+get_current_user_id used to; "after" calls the current dependency, which
+verifies once and then serves the cached claims. No server or database
+needed. Usage, from snap-species-backend/:
+
+    python -m scripts.bench_auth --calls 20000
+"""
+import argparse
+import asyncio
+import time
+
+from fastapi.security import HTTPAuthorizationCredentials
+from jose import jwt
+
+from config import Settings
+from deps import get_current_user_id
+from routers.auth import create_access_token
+
+
+def _before(token: str) -> int:
+    settings = Settings()
+    payload = jwt.decode(token, settings.jwt_secret, algorithms=[settings.jwt_algorithm])
+    return int(payload["sub"])
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=20_000)
+    args = parser.parse_args()
+
+    token = create_access_token("42")
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+    started = time.perf_counter()
+    for _ in range(args.calls):
+        _before(token)
+    before = (time.perf_counter() - started) / args.calls * 1e6
+
+    started = time.perf_counter()
+    for _ in range(args.calls):
+        await get_current_user_id(credentials)
+    after = (time.perf_counter() - started) / args.calls * 1e6
+
+    print(f"{'variant':<8} {'us/request':>11}")
+    print(f"{'before':<8} {before:>11.1f}")
+    print(f"{'after':<8} {after:>11.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,62 @@
+"""Per-image latency and resident memory for each classifier backend.
+
+Every backend runs in a fresh process so RSS reflects that backend alone.
+Export artifacts first (python -m scripts.export_model). Usage, from
+snap-species-backend/:
+
+    python -m scripts.bench_backends --backends torch torchscript onnx int8 --images ~/photos
+"""
+import argparse
+import multiprocessing as mp
+import time
+
+import psutil
+import torch
+
+from scripts.sample_images import load_images
+from services.classification import BACKENDS, classify_batch, get_model, preprocess
+
+
+def _measure(backend: str, images: list[bytes], threads: int, queue: mp.Queue) -> None:
+    torch.set_num_threads(threads)
+    try:
+        get_model(backend)
+        tensors = [preprocess(img) for img in images]
+        classify_batch(tensors[:1], backend=backend)  # warm-up (compile, allocator)
+        timings = []
+        for tensor in tensors:
+            started = time.perf_counter()
+            classify_batch([tensor], backend=backend)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        rss = psutil.Process().memory_info().rss / 2**20
+        queue.put((backend, timings[len(timings) // 2], timings[int(0.95 * (len(timings) - 1))], rss, None))
+    except Exception as e:
+        queue.put((backend, 0.0, 0.0, 0.0, str(e)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=["torch", "torchscript", "onnx"])
+    parser.add_argument("--images", help="Folder of JPEG/PNG images (synthetic if omitted)")
+    parser.add_argument("--count", type=int, default=50)
+    parser.add_argument("--threads", type=int, default=torch.get_num_threads())
+    args = parser.parse_args()
+
+    images = load_images(args.images, args.count)
+    ctx = mp.get_context("spawn")
+    print(f"{'backend':<12} {'p50 ms':>8} {'p95 ms':>8} {'RSS MB':>8}")
+    for backend in args.backends:
+        queue = ctx.Queue()
+        proc = ctx.Process(target=_measure, args=(backend, images, args.threads, queue))
+        proc.start()
+        name, p50, p95, rss, error = queue.get()
+        proc.join()
+        if error:
+            print(f"{name:<12} failed: {error}")
+        else:
+            print(f"{name:<12} {p50:>8.2f} {p95:>8.2f} {rss:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
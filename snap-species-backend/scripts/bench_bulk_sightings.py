@@ -0,0 +1,116 @@
+"""Throughput of POST /api/sightings/bulk's stages for a 10k-row upload.
+
+Times parsing (JSON array, NDJSON, CSV), the column-wise validation, and
+the COPY + counter update. The write goes to temporary tables that shadow
+the real ones for this session, so nothing is written to the real schema.
+Usage, from snap-species-backend/:
+
+    python -m scripts.bench_bulk_sightings --rows 10000 --runs 5
+"""
+import argparse
+import asyncio
+import csv
+import io
+import json
+import random
+import time
+
+import asyncpg
+
+from config import get_settings
+from services import bulk_sightings
+
+SPECIES = [(f"Species {i}", f"Genus species{i}") for i in range(300)]
+
+
+def _rows(count: int) -> list[dict]:
+    out = []
+    for _ in range(count):
+        name, sci = random.choice(SPECIES)
+        out.append({
+            "name": name, "sci": sci, "status": random.choice(bulk_sightings.STATUSES),
+            "lat": round(random.uniform(-60, 60), 5), "lng": round(random.uniform(-180, 180), 5),
+            "threat_score": random.randint(0, 100), "timestamp": int(time.time()) - random.randint(0, 86400 * 30),
+        })
+    return out
+
+
+def _bodies(rows: list[dict]) -> dict[str, tuple[bytes, str]]:
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=list(rows[0]))
+    writer.writeheader()
+    writer.writerows(rows)
+    return {
+        "json": (json.dumps(rows).encode(), "application/json"),
+        "ndjson": ("\n".join(json.dumps(r) for r in rows).encode(), "application/x-ndjson"),
+        "csv": (buf.getvalue().encode(), "text/csv"),
+    }
+
+
+async def _shadow_tables(conn: asyncpg.Connection) -> None:
+    await conn.execute("""
+        CREATE TEMP TABLE sightings (
+            id SERIAL PRIMARY KEY, user_id INTEGER NOT NULL, name TEXT NOT NULL, sci TEXT NOT NULL,
+            status TEXT NOT NULL, lat DOUBLE PRECISION NOT NULL, lng DOUBLE PRECISION NOT NULL,
+            threat_score INTEGER NOT NULL, created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+        CREATE INDEX ON sightings (created_at DESC, id DESC);
+        CREATE INDEX ON sightings USING gist (point(lng, lat));
+        CREATE TEMP TABLE user_species (
+            user_id INTEGER NOT NULL, sci_key TEXT NOT NULL, endangered BOOLEAN NOT NULL,
+            PRIMARY KEY (user_id, sci_key)
+        );
+        CREATE TEMP TABLE user_stats (
+            user_id INTEGER PRIMARY KEY, sightings INTEGER NOT NULL DEFAULT 0, species INTEGER NOT NULL DEFAULT 0,
+            endangered_species INTEGER NOT NULL DEFAULT 0, threat_sum BIGINT NOT NULL DEFAULT 0,
+            avg_threat_score DOUBLE PRECISION GENERATED ALWAYS AS (
+                CASE WHEN sightings > 0 THEN threat_sum::float8 / sightings ELSE 0 END
+            ) STORED
+        );
+    """)
+
+
+def _rate(label: str, rows: int, seconds: list[float]) -> None:
+    best = min(seconds)
+    print(f"{label:<16} {best * 1000:>9.1f} {rows / best:>12,.0f}")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = _rows(args.rows)
+    print(f"{args.rows} rows, best of {args.runs}")
+    print(f"{'stage':<16} {'ms':>9} {'rows/s':>12}")
+    for fmt, (body, content_type) in _bodies(rows).items():
+        timings = []
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            bulk_sightings.parse_upload(body, content_type)
+            timings.append(time.perf_counter() - started)
+        _rate(f"parse {fmt}", args.rows, timings)
+
+    timings = []
+    for _ in range(args.runs):
+        started = time.perf_counter()
+        columns, _ = bulk_sightings.validate(rows)
+        timings.append(time.perf_counter() - started)
+    _rate("validate", args.rows, timings)
+
+    conn = await asyncpg.connect(get_settings().db_url)
+    try:
+        await _shadow_tables(conn)
+        timings = []
+        for user_id in range(1, args.runs + 1):
+            started = time.perf_counter()
+            await bulk_sightings.write(conn, user_id, columns)
+            timings.append(time.perf_counter() - started)
+        _rate("copy + stats", args.rows, timings)
+    finally:
+        await conn.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,64 @@
+"""CPU throughput of MobileNet with and without micro-batching.
+
+Each client sends --requests images back to back; reports images/s and p95
+latency per concurrency level. Usage, from snap-species-backend/:
+
+    python -m scripts.bench_inference --clients 1 8 32 --requests 20
+"""
+import argparse
+import asyncio
+import time
+
+from scripts.sample_images import synthetic_jpeg
+from services.classification import get_model, run_mobilenet
+from services.executor import inference_executor
+from services.inference import BatchingEngine
+
+
+async def _drive(classify, clients: int, requests: int, image: bytes) -> tuple[float, float]:
+    latencies: list[float] = []
+
+    async def client() -> None:
+        for _ in range(requests):
+            started = time.perf_counter()
+            await classify(image)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+    return clients * requests / elapsed, p95 * 1000
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--max-batch", type=int, default=16)
+    parser.add_argument("--max-wait-ms", type=float, default=10.0)
+    args = parser.parse_args()
+
+    image = synthetic_jpeg()
+    get_model()
+    loop = asyncio.get_running_loop()
+
+    async def unbatched(data: bytes):
+        return await loop.run_in_executor(None, run_mobilenet, data)
+
+    engine = BatchingEngine(args.max_batch, args.max_wait_ms, inference_executor)
+    await engine.start()
+    try:
+        print(f"{'clients':>7} {'mode':<10} {'img/s':>8} {'p95 ms':>9}")
+        for clients in args.clients:
+            for label, classify in (("single", unbatched), ("batched", engine.classify)):
+                rate, p95 = await _drive(classify, clients, args.requests, image)
+                print(f"{clients:>7} {label:<10} {rate:>8.1f} {p95:>9.1f}")
+        print("batch sizes:", engine.stats()["batch_sizes"])
+    finally:
+        await engine.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,73 @@
+"""Event-loop lag during a login storm: bcrypt inline vs on the hashing pool.
+
+A probe task sleeps 5 ms in a loop and records how late it wakes up, which is
+what every other request on the worker waits on, while --logins concurrent
+password checks run. No server or database needed. Usage, from
+snap-species-backend/:
+
+    python -m scripts.bench_login_lag --logins 50 --rounds 12
+"""
+import argparse
+import asyncio
+import time
+
+from passlib.context import CryptContext
+
+from services.passwords import PasswordHasher
+
+PROBE_INTERVAL = 0.005
+
+
+async def _probe(lags: list[float], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append((time.perf_counter() - started - PROBE_INTERVAL) * 1000)
+
+
+async def _storm(check, logins: int) -> tuple[list[float], float]:
+    lags: list[float] = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(_probe(lags, stop))
+    await asyncio.sleep(0.05)
+    started = time.perf_counter()
+    await asyncio.gather(*(check() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe
+    return sorted(lags), elapsed
+
+
+def _report(label: str, lags: list[float], elapsed: float, logins: int) -> None:
+    p50 = lags[len(lags) // 2]
+    p99 = lags[min(len(lags) - 1, int(0.99 * len(lags)))]
+    print(f"{label:<10} {p50:>9.1f} {p99:>9.1f} {lags[-1]:>9.1f} {logins / elapsed:>10.1f}")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt cost (BCRYPT_ROUNDS)")
+    parser.add_argument("--workers", type=int, default=2, help="PASSWORD_HASH_WORKERS")
+    args = parser.parse_args()
+
+    ctx = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=args.rounds)
+    stored = ctx.hash("correct horse battery staple")
+    hasher = PasswordHasher(rounds=args.rounds, workers=args.workers, max_pending=args.logins)
+
+    async def inline() -> None:
+        ctx.verify("correct horse battery staple", stored)
+
+    async def pooled() -> None:
+        await hasher.verify("correct horse battery staple", stored)
+
+    print(f"{args.logins} concurrent logins, bcrypt cost {args.rounds}, {args.workers} hashing threads")
+    print(f"{'variant':<10} {'lag p50':>9} {'lag p99':>9} {'lag max':>9} {'logins/s':>10}  (ms)")
+    for label, check in (("inline", inline), ("pool", pooled)):
+        lags, elapsed = await _storm(check, args.logins)
+        _report(label, lags, elapsed, args.logins)
+    hasher.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
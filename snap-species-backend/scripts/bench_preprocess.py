@@ -0,0 +1,56 @@
+"""Decode + preprocess time: torchvision PREPROCESS vs the fast path.
+
+Defaults to synthetic 12 MP (4000x3000) JPEGs; pass --images for real phone
+photos. Also reports the largest per-pixel difference and top-1 agreement
+between the two inputs (photos with an EXIF rotation differ by design: the
+reference ignores orientation). Usage, from snap-species-backend/:
+
+    python -m scripts.bench_preprocess --count 20
+"""
+import argparse
+import time
+
+import torch
+
+from scripts.sample_images import load_images, synthetic_jpeg
+from services.classification import classify_batch, preprocess, preprocess_reference
+
+
+def _time(fn, images: list[bytes]) -> tuple[list[torch.Tensor], float, float]:
+    out, timings = [], []
+    for img in images:
+        started = time.perf_counter()
+        out.append(fn(img))
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return out, timings[len(timings) // 2], timings[int(0.95 * (len(timings) - 1))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images", help="Folder of photos (synthetic 12 MP JPEGs if omitted)")
+    parser.add_argument("--count", type=int, default=20)
+    parser.add_argument("--no-model", action="store_true", help="Skip the top-1 agreement check")
+    args = parser.parse_args()
+
+    if args.images:
+        images = load_images(args.images, args.count)
+    else:
+        images = [synthetic_jpeg(4000, 3000, seed=i) for i in range(args.count)]
+    print(f"{len(images)} images, mean size {sum(map(len, images)) / len(images) / 2**20:.1f} MB")
+
+    ref, ref_p50, ref_p95 = _time(preprocess_reference, images)
+    fast, fast_p50, fast_p95 = _time(preprocess, images)
+    print(f"{'pipeline':<12} {'p50 ms':>8} {'p95 ms':>8}")
+    print(f"{'reference':<12} {ref_p50:>8.1f} {ref_p95:>8.1f}")
+    print(f"{'fast':<12} {fast_p50:>8.1f} {fast_p95:>8.1f}")
+    print(f"max abs diff: {max((a - b).abs().max().item() for a, b in zip(ref, fast)):.3f}")
+
+    if not args.no_model:
+        a = [label for label, _ in classify_batch(ref)]
+        b = [label for label, _ in classify_batch(fast)]
+        print(f"top-1 agreement: {sum(x == y for x, y in zip(a, b))}/{len(a)}")
+
+
+if __name__ == "__main__":
+    main()
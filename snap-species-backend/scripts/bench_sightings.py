@@ -0,0 +1,98 @@
+"""Compare the old per-row reporter lookup with the joined map-feed query.
+
+Runs against DB_URL using temporary tables (nothing is written to the real
+schema). The n+1 variant reuses one connection, so it understates the old
+connect-per-lookup cost. Usage, from snap-species-backend/:
+
+    python -m scripts.bench_sightings --rows 500 1000 --runs 50
+"""
+import argparse
+import asyncio
+import random
+import time
+
+import asyncpg
+
+from config import get_settings
+
+FEED_ROWS = """
+    SELECT s.id, s.user_id, s.name, s.sci, s.status, s.lat, s.lng, s.threat_score, s.created_at
+    FROM sightings s
+    ORDER BY s.created_at DESC
+    LIMIT $1
+"""
+
+FEED_JOINED = """
+    SELECT s.id, s.user_id, s.name, s.sci, s.status, s.lat, s.lng, s.threat_score, s.created_at,
+           u.name AS reporter
+    FROM sightings s
+    LEFT JOIN users u ON u.id = s.user_id
+    ORDER BY s.created_at DESC
+    LIMIT $1
+"""
+
+
+async def _seed(conn: asyncpg.Connection, rows: int, users: int) -> None:
+    await conn.execute("""
+        CREATE TEMP TABLE users (id SERIAL PRIMARY KEY, name TEXT NOT NULL);
+        CREATE TEMP TABLE sightings (
+            id SERIAL PRIMARY KEY, user_id INTEGER NOT NULL, name TEXT NOT NULL, sci TEXT NOT NULL,
+            status TEXT NOT NULL, lat DOUBLE PRECISION NOT NULL, lng DOUBLE PRECISION NOT NULL,
+            threat_score INTEGER NOT NULL, created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+        CREATE INDEX ON sightings(created_at);
+    """)
+    await conn.copy_records_to_table("users", records=[(f"User {i}",) for i in range(users)], columns=["name"])
+    await conn.copy_records_to_table(
+        "sightings",
+        records=[
+            (random.randint(1, users), "Tiger", "Panthera tigris", "EN",
+             random.uniform(-60, 60), random.uniform(-180, 180), 80)
+            for _ in range(rows)
+        ],
+        columns=["user_id", "name", "sci", "status", "lat", "lng", "threat_score"],
+    )
+
+
+async def _n_plus_one(conn: asyncpg.Connection, limit: int) -> int:
+    rows = await conn.fetch(FEED_ROWS, limit)
+    for row in rows:
+        await conn.fetchrow("SELECT name FROM users WHERE id = $1", row["user_id"])
+    return 1 + len(rows)
+
+
+async def _joined(conn: asyncpg.Connection, limit: int) -> int:
+    await conn.fetch(FEED_JOINED, limit)
+    return 1
+
+
+def _p95(samples: list[float]) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(0.95 * len(samples)))]
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[500, 1000])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--runs", type=int, default=30)
+    args = parser.parse_args()
+
+    conn = await asyncpg.connect(get_settings().db_url)
+    try:
+        await _seed(conn, max(args.rows), args.users)
+        print(f"{'rows':>6} {'variant':<12} {'queries':>8} {'p95 ms':>9}")
+        for limit in args.rows:
+            for label, fn in (("n+1", _n_plus_one), ("joined", _joined)):
+                timings, queries = [], 0
+                for _ in range(args.runs):
+                    started = time.perf_counter()
+                    queries = await fn(conn, limit)
+                    timings.append((time.perf_counter() - started) * 1000)
+                print(f"{limit:>6} {label:<12} {queries:>8} {_p95(timings):>9.2f}")
+    finally:
+        await conn.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,119 @@
+"""Profile queries for a heavy user: live aggregation vs the user_stats row,
+and the history page with and without the covering index.
+
+Runs against DB_URL using temporary tables (nothing is written to the real
+schema). Usage, from snap-species-backend/:
+
+    python -m scripts.bench_user_stats --sightings 50000 --runs 50
+"""
+import argparse
+import asyncio
+import random
+import time
+
+import asyncpg
+
+from config import get_settings
+
+STATS_LIVE = """
+    SELECT
+        COUNT(*) AS total_sightings,
+        COUNT(DISTINCT CASE WHEN status IN ('CR', 'EN', 'VU') THEN LOWER(TRIM(sci)) END) AS endangered_species,
+        COALESCE(AVG(threat_score), 0) AS avg_threat_score
+    FROM sightings
+    WHERE user_id = $1
+"""
+
+STATS_ROW = "SELECT sightings, endangered_species, avg_threat_score FROM user_stats WHERE user_id = $1"
+
+HISTORY_PAGE = """
+    SELECT id, name, sci, status, lat, lng, threat_score, created_at
+    FROM sightings WHERE user_id = $1
+    ORDER BY created_at DESC, id DESC
+    LIMIT 200
+"""
+
+SPECIES = [(f"Species {i}", f"Genus species{i}", random.choice(["CR", "EN", "VU", "NT", "LC"])) for i in range(400)]
+
+
+async def _seed(conn: asyncpg.Connection, sightings: int) -> None:
+    await conn.execute("""
+        CREATE TEMP TABLE sightings (
+            id SERIAL PRIMARY KEY, user_id INTEGER NOT NULL, name TEXT NOT NULL, sci TEXT NOT NULL,
+            status TEXT NOT NULL, lat DOUBLE PRECISION NOT NULL, lng DOUBLE PRECISION NOT NULL,
+            threat_score INTEGER NOT NULL, created_at TIMESTAMPTZ NOT NULL
+        );
+        CREATE INDEX ON sightings(user_id);
+    """)
+    now = time.time()
+    records = []
+    # The heavy user (1) plus background users so the table is not all one user.
+    for user_id, count in ((1, sightings), *((u, 50) for u in range(2, 2002))):
+        for _ in range(count):
+            name, sci, status = random.choice(SPECIES)
+            records.append((
+                user_id, name, sci, status, random.uniform(-60, 60), random.uniform(-180, 180),
+                random.randint(0, 100), now - random.uniform(0, 3 * 365 * 86400),
+            ))
+    await conn.execute("""
+        CREATE TEMP TABLE sightings_load (
+            user_id INTEGER, name TEXT, sci TEXT, status TEXT, lat DOUBLE PRECISION, lng DOUBLE PRECISION,
+            threat_score INTEGER, ts DOUBLE PRECISION
+        )
+    """)
+    await conn.copy_records_to_table(
+        "sightings_load",
+        records=records,
+        columns=["user_id", "name", "sci", "status", "lat", "lng", "threat_score", "ts"],
+    )
+    await conn.execute("""
+        INSERT INTO sightings (user_id, name, sci, status, lat, lng, threat_score, created_at)
+        SELECT user_id, name, sci, status, lat, lng, threat_score, to_timestamp(ts) FROM sightings_load;
+        CREATE TEMP TABLE user_stats AS
+        SELECT user_id, COUNT(*) AS sightings,
+               COUNT(DISTINCT CASE WHEN status IN ('CR', 'EN', 'VU') THEN LOWER(TRIM(sci)) END) AS endangered_species,
+               AVG(threat_score)::float8 AS avg_threat_score
+        FROM sightings GROUP BY user_id;
+        ALTER TABLE user_stats ADD PRIMARY KEY (user_id);
+    """)
+    await conn.execute("VACUUM ANALYZE sightings")
+    await conn.execute("ANALYZE user_stats")
+
+
+async def _time(conn: asyncpg.Connection, query: str, runs: int) -> tuple[float, float]:
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        await conn.fetch(query, 1)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2], timings[min(len(timings) - 1, int(0.95 * len(timings)))]
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sightings", type=int, default=50_000, help="Sightings of the heavy user")
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    conn = await asyncpg.connect(get_settings().db_url)
+    try:
+        await _seed(conn, args.sightings)
+        print(f"{'query':<28} {'p50 ms':>8} {'p95 ms':>8}")
+        for label, query in (("stats: live aggregate", STATS_LIVE), ("stats: user_stats row", STATS_ROW),
+                             ("history: user_id index", HISTORY_PAGE)):
+            p50, p95 = await _time(conn, query, args.runs)
+            print(f"{label:<28} {p50:>8.2f} {p95:>8.2f}")
+        await conn.execute("""
+            CREATE INDEX ON sightings (user_id, created_at DESC, id DESC)
+            INCLUDE (name, sci, status, lat, lng, threat_score)
+        """)
+        await conn.execute("VACUUM ANALYZE sightings")
+        p50, p95 = await _time(conn, HISTORY_PAGE, args.runs)
+        print(f"{'history: covering index':<28} {p50:>8.2f} {p95:>8.2f}")
+    finally:
+        await conn.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,83 @@
+"""Export MobileNetV3 for the onnx / torchscript classifier backends.
+
+Writes the artifacts to CLASSIFIER_MODEL_DIR (default ./models) and checks
+that every exported backend gives the same top-1 label as eager PyTorch.
+Usage, from snap-species-backend/:
+
+    python -m scripts.export_model                      # both formats, parity on synthetic images
+    python -m scripts.export_model --images ~/photos    # parity on real photos
+"""
+import argparse
+import os
+import sys
+
+import torch
+
+from config import get_settings, reload_settings
+from scripts.sample_images import load_images
+from services.classification import (
+    ONNX_FILENAME,
+    TORCHSCRIPT_FILENAME,
+    classify_batch,
+    load_eager_model,
+    preprocess,
+)
+
+
+def export_onnx(model: torch.nn.Module, path: str) -> None:
+    dummy = torch.randn(1, 3, 224, 224)
+    torch.onnx.export(
+        model,
+        dummy,
+        path,
+        input_names=["input"],
+        output_names=["logits"],
+        dynamic_axes={"input": {0: "batch"}, "logits": {0: "batch"}},
+        opset_version=17,
+    )
+
+
+def export_torchscript(model: torch.nn.Module, path: str) -> None:
+    traced = torch.jit.trace(model, torch.randn(1, 3, 224, 224))
+    traced = torch.jit.freeze(traced)
+    traced.save(path)
+
+
+def check_parity(backends: list[str], images: list[bytes]) -> bool:
+    tensors = [preprocess(img) for img in images]
+    reference = [label for label, _ in classify_batch(tensors, backend="torch")]
+    ok = True
+    for backend in backends:
+        labels = [label for label, _ in classify_batch(tensors, backend=backend)]
+        matches = sum(a == b for a, b in zip(reference, labels))
+        print(f"{backend:<12} top-1 parity {matches}/{len(reference)}")
+        ok = ok and matches == len(reference)
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--format", nargs="+", choices=["onnx", "torchscript"], default=["onnx", "torchscript"])
+    parser.add_argument("--out", default=get_settings().classifier_model_dir)
+    parser.add_argument("--images", help="Folder of JPEG/PNG images for the parity check")
+    parser.add_argument("--count", type=int, default=32, help="Images used for the parity check")
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    os.environ["CLASSIFIER_MODEL_DIR"] = args.out
+    reload_settings()  # the parity check loads the exported artifacts from args.out
+    model = load_eager_model()
+    with torch.no_grad():
+        if "onnx" in args.format:
+            export_onnx(model, os.path.join(args.out, ONNX_FILENAME))
+            print("wrote", os.path.join(args.out, ONNX_FILENAME))
+        if "torchscript" in args.format:
+            export_torchscript(model, os.path.join(args.out, TORCHSCRIPT_FILENAME))
+            print("wrote", os.path.join(args.out, TORCHSCRIPT_FILENAME))
+
+    if not check_parity(args.format, load_images(args.images, args.count)):
+        sys.exit("Exported model disagrees with eager PyTorch on top-1 labels")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Bulk-import community accounts from CSV with COPY.
+
+The CSV needs a header with `email` and `name`, plus either `password_hash`
+(an existing $2a$/$2b$/$2y$ bcrypt hash, kept as is; rows with anything
+else are skipped) or `password` (hashed here at BCRYPT_ROUNDS); an optional
+`created_at` (ISO 8601) preserves join dates. Rows are COPYed into a
+temporary staging table with their line numbers and inserted in one
+statement; emails that already exist, in the table or earlier in the file,
+are skipped. Usage, from snap-species-backend/:
+
+    python -m scripts.import_users accounts.csv
+"""
+import argparse
+import asyncio
+import csv
+import re
+import sys
+from datetime import datetime
+
+import asyncpg
+
+from config import get_settings
+from database import ensure_schema
+from services.passwords import hasher
+
+# What passlib's bcrypt handler accepts; anything else would make login raise instead of fail.
+_BCRYPT_HASH = re.compile(r"^\$2[aby]\$\d{2}\$[./A-Za-z0-9]{53}$")
+
+
+async def _read_rows(path: str) -> list[tuple]:
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        missing = {"email", "name"} - set(reader.fieldnames or ())
+        if missing or not {"password_hash", "password"} & set(reader.fieldnames or ()):
+            sys.exit("CSV needs email, name and password_hash or password columns")
+        raw = list(reader)
+
+    rows = []
+    for line, r in enumerate(raw, start=2):
+        email = (r.get("email") or "").strip().lower()
+        name = (r.get("name") or "").strip()
+        password_hash = (r.get("password_hash") or "").strip()
+        if not email or not name or not (password_hash or r.get("password")):
+            print(f"line {line}: missing email, name or password, skipped")
+            continue
+        if password_hash and not _BCRYPT_HASH.match(password_hash):
+            print(f"line {line}: password_hash is not a bcrypt hash, skipped")
+            continue
+        created = (r.get("created_at") or "").strip()
+        rows.append([email, name, password_hash or r["password"], datetime.fromisoformat(created) if created else None,
+                     line, not password_hash])
+
+    # Plain passwords are hashed on the bcrypt pool, as many at a time as it admits.
+    plain = [row for row in rows if row[5]]
+    for start in range(0, len(plain), hasher.max_pending):
+        chunk = plain[start:start + hasher.max_pending]
+        for row, hashed in zip(chunk, await asyncio.gather(*(hasher.hash(row[2]) for row in chunk))):
+            row[2] = hashed
+    return [tuple(row[:5]) for row in rows]
+
+
+async def import_users(conn: asyncpg.Connection, rows: list[tuple]) -> int:
+    """COPY (email, name, password_hash, created_at, line_no) rows in; returns how many were inserted.
+
+    Among rows with the same email, the lowest line_no wins.
+    """
+    async with conn.transaction():
+        await conn.execute("""
+            CREATE TEMP TABLE users_import (
+                email TEXT NOT NULL, name TEXT NOT NULL, password_hash TEXT NOT NULL, created_at TIMESTAMPTZ,
+                line_no INTEGER NOT NULL
+            ) ON COMMIT DROP
+        """)
+        await conn.copy_records_to_table(
+            "users_import", records=rows, columns=["email", "name", "password_hash", "created_at", "line_no"]
+        )
+        result = await conn.execute("""
+            INSERT INTO users (email, name, password_hash, created_at)
+            SELECT DISTINCT ON (email) email, name, password_hash, COALESCE(created_at, now())
+            FROM users_import
+            ORDER BY email, line_no
+            ON CONFLICT (email) DO NOTHING
+        """)
+    return int(result.split()[-1])
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("csv", help="CSV file with email,name,password_hash|password[,created_at]")
+    args = parser.parse_args()
+
+    rows = await _read_rows(args.csv)
+    hasher.shutdown()
+    conn = await asyncpg.connect(get_settings().db_url)
+    try:
+        await ensure_schema(conn)
+        inserted = await import_users(conn, rows)
+    finally:
+        await conn.close()
+    print(f"{inserted} user(s) imported, {len(rows) - inserted} skipped (email already registered or repeated)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
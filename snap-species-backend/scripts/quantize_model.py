@@ -0,0 +1,71 @@
+"""Build the statically quantized (INT8) classifier for CLASSIFIER_BACKEND=int8.
+
+Calibrates activation ranges on a local image folder (use photos similar
+to what users upload), saves a TorchScript artifact to CLASSIFIER_MODEL_DIR
+and reports top-1 agreement and confidence drift against the float model.
+Compare latency/RSS afterwards with scripts.bench_backends. Usage, from
+snap-species-backend/:
+
+    python -m scripts.quantize_model --images ~/calibration --eval-images ~/holdout
+"""
+import argparse
+import os
+
+import torch
+from torchvision.models import MobileNet_V3_Large_Weights
+from torchvision.models.quantization import mobilenet_v3_large as quantizable_mobilenet_v3_large
+
+from config import get_settings
+from scripts.sample_images import load_images
+from services.classification import INT8_FILENAME, classify_batch, preprocess, set_quantized_engine
+
+
+def calibrate_and_convert(images: list[bytes], batch_size: int) -> torch.nn.Module:
+    engine = set_quantized_engine()
+    model = quantizable_mobilenet_v3_large(weights=MobileNet_V3_Large_Weights.IMAGENET1K_V2, quantize=False)
+    model.eval()
+    model.fuse_model(is_qat=False)
+    model.qconfig = torch.ao.quantization.get_default_qconfig(engine)
+    torch.ao.quantization.prepare(model, inplace=True)
+    tensors = [preprocess(img) for img in images]
+    with torch.no_grad():
+        for i in range(0, len(tensors), batch_size):
+            model(torch.stack(tensors[i : i + batch_size]))
+    torch.ao.quantization.convert(model, inplace=True)
+    print(f"calibrated on {len(tensors)} images with the {engine} engine")
+    return model
+
+
+def report_accuracy_delta(images: list[bytes]) -> None:
+    tensors = [preprocess(img) for img in images]
+    reference = classify_batch(tensors, backend="torch")
+    quantized = classify_batch(tensors, backend="int8")
+    agree = sum(r[0] == q[0] for r, q in zip(reference, quantized))
+    drift = sum(abs(r[1] - q[1]) for r, q in zip(reference, quantized)) / len(reference)
+    print(f"top-1 agreement with float model: {agree}/{len(reference)} ({agree / len(reference):.1%})")
+    print(f"mean confidence drift: {drift:.2f} points")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images", required=True, help="Calibration image folder")
+    parser.add_argument("--count", type=int, default=200, help="Calibration images to use")
+    parser.add_argument("--eval-images", help="Held-out folder for the accuracy report (defaults to --images)")
+    parser.add_argument("--eval-count", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=16)
+    args = parser.parse_args()
+
+    out_dir = get_settings().classifier_model_dir
+    os.makedirs(out_dir, exist_ok=True)
+    model = calibrate_and_convert(load_images(args.images, args.count), args.batch_size)
+    path = os.path.join(out_dir, INT8_FILENAME)
+    with torch.no_grad():
+        traced = torch.jit.trace(model, torch.randn(1, 3, 224, 224))
+    traced.save(path)
+    print("wrote", path, f"({os.path.getsize(path) / 2**20:.1f} MB)")
+
+    report_accuracy_delta(load_images(args.eval_images or args.images, args.eval_count))
+
+
+if __name__ == "__main__":
+    main()
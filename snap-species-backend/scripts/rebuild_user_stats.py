@@ -0,0 +1,43 @@
+"""Rebuild or verify the per-user leaderboard counters (user_stats, user_species).
+
+--check compares the stored counters with the full aggregation the
+leaderboard used to run and exits non-zero on any mismatch. Usage, from
+snap-species-backend/:
+
+    python -m scripts.rebuild_user_stats          # recompute from sightings
+    python -m scripts.rebuild_user_stats --check  # report drift only
+"""
+import argparse
+import asyncio
+import sys
+
+import asyncpg
+
+from config import get_settings
+from database import ensure_schema
+from services import user_stats
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--check", action="store_true", help="Only compare stored counters with a live aggregation")
+    args = parser.parse_args()
+
+    conn = await asyncpg.connect(get_settings().db_url)
+    try:
+        await ensure_schema(conn)
+        if not args.check:
+            await user_stats.rebuild(conn)
+            print("user_stats rebuilt")
+        mismatches = await user_stats.check_consistency(conn)
+    finally:
+        await conn.close()
+
+    for m in mismatches[:20]:
+        print(m)
+    print(f"{len(mismatches)} user(s) out of sync")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,30 @@
+"""Image inputs shared by the model scripts: a local folder or synthetic JPEGs."""
+import io
+import os
+
+import numpy as np
+from PIL import Image
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+
+def synthetic_jpeg(width: int = 1024, height: int = 768, seed: int | None = None) -> bytes:
+    rng = np.random.default_rng(seed)
+    pixels = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(pixels).save(buf, format="JPEG", quality=90)
+    return buf.getvalue()
+
+
+def load_images(folder: str | None, count: int) -> list[bytes]:
+    """Up to `count` image files from folder (sorted), or synthetic images if no folder."""
+    if not folder:
+        return [synthetic_jpeg(seed=i) for i in range(count)]
+    names = sorted(n for n in os.listdir(folder) if n.lower().endswith(IMAGE_EXTENSIONS))
+    out = []
+    for name in names[:count]:
+        with open(os.path.join(folder, name), "rb") as f:
+            out.append(f.read())
+    if not out:
+        raise SystemExit(f"No images found in {folder}")
+    return out
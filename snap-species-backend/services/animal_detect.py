@@ -1,6 +1,5 @@
-import httpx
-
 from config import get_settings
+from services.http import get_client
 
 ANIMAL_DETECT_BASE = "https://www.animaldetect.com/api/v1"
 
@@ -15,13 +14,12 @@ async def detect_species(image_bytes: bytes, country: str | None = None) -> tupl
     data: dict[str, str] = {}
     if country:
         data["country"] = country
-    async with httpx.AsyncClient(timeout=30) as client:
-        try:
-            resp = await client.post(url, headers=headers, files=files, data=data or None)
-            resp.raise_for_status()
-            body = resp.json()
-        except Exception:
-            return None
+    try:
+        resp = await get_client("animal_detect").post(url, headers=headers, files=files, data=data or None)
+        resp.raise_for_status()
+        body = resp.json()
+    except Exception:
+        return None
     detections = body.get("detections") or body.get("results") or body.get("predictions") or []
     if not detections:
         first = body.get("detection") or body.get("top_prediction")
@@ -0,0 +1,178 @@
+"""Bulk sighting upload: parse JSON/NDJSON/CSV, validate column-wise, COPY in one transaction.
+
+Validation runs on numpy columns rather than row by row, so a 10k-row
+upload costs a handful of array operations. Rows that fail are reported
+by index and skipped; the rest are written together with the uploader's
+counters, or not at all.
+"""
+import csv
+import io
+import json
+import time
+from datetime import datetime, timezone
+
+import asyncpg
+import numpy as np
+
+from services import map_tiles, user_stats
+from services.leaderboard import snapshots
+
+STATUSES = ("CR", "EN", "VU", "NT", "LC")
+COLUMNS = ("name", "sci", "status", "lat", "lng", "threat_score", "timestamp")
+# Per-point invalidation is ~23 cache pops; past this many rows, drop the tile cache instead.
+_TILE_INVALIDATE_ALL = 200
+# Offline captures may come from a device with a slightly fast clock.
+_MAX_CLOCK_SKEW = 300
+# name/sci longer than this are row errors; also keeps the fixed-width text arrays small.
+MAX_TEXT_LENGTH = 200
+
+
+def parse_upload(body: bytes, content_type: str) -> list[dict]:
+    """Rows from a JSON array, NDJSON or CSV body; raises ValueError on malformed input."""
+    kind = content_type.split(";")[0].strip().lower()
+    text = body.decode("utf-8-sig")
+    if kind in ("application/x-ndjson", "application/ndjson", "application/jsonl"):
+        rows = [json.loads(line) for line in text.splitlines() if line.strip()]
+    elif kind in ("text/csv", "application/csv"):
+        try:
+            rows = list(csv.DictReader(io.StringIO(text)))
+        except csv.Error as e:  # NUL bytes, fields over csv.field_size_limit()
+            raise ValueError(f"Malformed CSV: {e}") from e
+    elif kind == "application/json":
+        rows = json.loads(text)
+        if not isinstance(rows, list):
+            raise ValueError("JSON body must be an array of sightings")
+    else:
+        raise ValueError("Use application/json, application/x-ndjson or text/csv")
+    if not all(isinstance(r, dict) for r in rows):
+        raise ValueError("Every sighting must be an object")
+    return rows
+
+
+def _is_missing(value) -> bool:
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def _float_column(values: list) -> tuple[np.ndarray, np.ndarray]:
+    """float64 column plus a mask of missing values; NaN where a present value is not a number."""
+    missing = np.fromiter((_is_missing(v) for v in values), dtype=bool, count=len(values))
+    values = [None if m else v for v, m in zip(values, missing)]
+    try:
+        out = np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        out = np.full(len(values), np.nan)
+        for i, v in enumerate(values):
+            try:
+                out[i] = float(v) if v is not None else np.nan
+            except (TypeError, ValueError):
+                pass
+    # A present "nan" stays NaN and fails validation like any other non-number.
+    return out, missing
+
+
+def _timestamp_column(values: list) -> tuple[np.ndarray, np.ndarray]:
+    """Unix seconds plus a missing mask; accepts numbers and ISO-8601 strings (naive ones are UTC)."""
+    ts, missing = _float_column(values)
+    for i in np.flatnonzero(np.isnan(ts) & ~missing):
+        v = values[int(i)]
+        if not isinstance(v, str):
+            continue
+        try:
+            dt = datetime.fromisoformat(v.strip().replace("Z", "+00:00"))
+        except ValueError:
+            continue
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        ts[i] = dt.timestamp()
+    return ts, missing
+
+
+def _text_column(values: list) -> tuple[np.ndarray, np.ndarray]:
+    """Stripped text column plus a mask of values over MAX_TEXT_LENGTH.
+
+    Over-long values are blanked before the array is built: numpy sizes every
+    cell to the longest string, so one 5 MB name would cost 5 MB per row.
+    """
+    texts = ["" if v is None else str(v).strip() for v in values]
+    too_long = np.fromiter((len(t) > MAX_TEXT_LENGTH for t in texts), dtype=bool, count=len(texts))
+    return np.asarray(["" if long else t for t, long in zip(texts, too_long)], dtype=str), too_long
+
+
+def validate(rows: list[dict]) -> tuple[dict[str, np.ndarray], list[dict]]:
+    """Valid rows as columns (name, sci, status, lat, lng, threat_score, timestamp), plus errors."""
+    cols = {c: [r.get(c) for r in rows] for c in COLUMNS}
+    name, name_long = _text_column(cols["name"])
+    sci, sci_long = _text_column(cols["sci"])
+    status, status_long = _text_column(cols["status"])
+    status = np.char.upper(status)
+    status[status == ""] = "LC"
+    lat, _ = _float_column(cols["lat"])
+    lng, _ = _float_column(cols["lng"])
+    # Only absent values get defaults; anything present but unparseable is a row error.
+    threat, threat_missing = _float_column(cols["threat_score"])
+    threat[threat_missing] = 0
+    ts, ts_missing = _timestamp_column(cols["timestamp"])
+    now = time.time()
+    ts[ts_missing] = now
+
+    checks = (
+        (~name_long, f"name must be at most {MAX_TEXT_LENGTH} characters"),
+        (~sci_long, f"sci must be at most {MAX_TEXT_LENGTH} characters"),
+        ((name != "") & (sci != ""), "name and sci are required"),
+        (np.isin(status, STATUSES) & ~status_long, f"status must be one of {', '.join(STATUSES)}"),
+        (np.abs(lat) <= 90, "lat must be between -90 and 90"),  # NaN compares False
+        (np.abs(lng) <= 180, "lng must be between -180 and 180"),
+        (
+            (threat >= 0) & (threat <= 100) & (threat == np.floor(threat)),
+            "threat_score must be an integer between 0 and 100",
+        ),
+        (
+            (ts > 0) & (ts <= now + _MAX_CLOCK_SKEW),
+            "timestamp must be a past Unix time in seconds or an ISO-8601 date-time",
+        ),
+    )
+    valid = np.ones(len(rows), dtype=bool)
+    errors = []
+    for ok, message in checks:
+        bad = valid & ~ok
+        errors.extend({"row": int(i), "error": message} for i in np.flatnonzero(bad))
+        valid &= ok
+    errors.sort(key=lambda e: e["row"])
+    columns = {
+        "name": name[valid], "sci": sci[valid], "status": status[valid], "lat": lat[valid], "lng": lng[valid],
+        "threat_score": threat[valid].astype(np.int64), "timestamp": ts[valid],
+    }
+    return columns, errors
+
+
+async def write(conn: asyncpg.Connection, user_id: int, columns: dict[str, np.ndarray]) -> int:
+    """COPY the validated rows and update the uploader's counters in one transaction."""
+    count = len(columns["name"])
+    if count == 0:
+        return 0
+    created = [datetime.fromtimestamp(t, tz=timezone.utc) for t in columns["timestamp"].tolist()]
+    records = zip(
+        [user_id] * count,
+        columns["name"].tolist(), columns["sci"].tolist(), columns["status"].tolist(),
+        columns["lat"].tolist(), columns["lng"].tolist(), columns["threat_score"].tolist(), created,
+    )
+    async with conn.transaction():
+        await conn.copy_records_to_table(
+            "sightings",
+            records=records,
+            columns=["user_id", "name", "sci", "status", "lat", "lng", "threat_score", "created_at"],
+        )
+        await user_stats.record_bulk(
+            conn,
+            user_id,
+            columns["sci"].tolist(),
+            np.isin(columns["status"], user_stats.ENDANGERED_STATUSES).tolist(),
+            int(columns["threat_score"].sum()),
+        )
+    if count > _TILE_INVALIDATE_ALL:
+        map_tiles.invalidate_all()
+    else:
+        for lat, lng in zip(columns["lat"].tolist(), columns["lng"].tolist()):
+            map_tiles.invalidate_point(lat, lng)
+    snapshots.mark_dirty()
+    return count
@@ -2,10 +2,13 @@ import io
 import os
 from functools import lru_cache
 
+import numpy as np
 import torch
 import torchvision.transforms as T
 from torchvision.models import mobilenet_v3_large, MobileNet_V3_Large_Weights
-from PIL import Image
+from PIL import Image, ImageOps
+
+from config import get_settings
 
 try:
     import certifi
@@ -16,29 +19,173 @@ try:
 except Exception:
     pass
 
+RESIZE_SIZE = 256
+INPUT_SIZE = 224
+MEAN = [0.485, 0.456, 0.406]
+STD = [0.229, 0.224, 0.225]
+
+# Reference torchvision pipeline; preprocess() below produces the same input faster.
 PREPROCESS = T.Compose([
-    T.Resize(256),
-    T.CenterCrop(224),
+    T.Resize(RESIZE_SIZE),
+    T.CenterCrop(INPUT_SIZE),
     T.ToTensor(),
-    T.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225]),
+    T.Normalize(mean=MEAN, std=STD),
 ])
 
+# uint8 value -> normalised float, per channel: normalising is one table lookup per pixel.
+_NORMALIZE_LUT = (
+    (np.arange(256, dtype=np.float32)[None, :] / 255.0 - np.array(MEAN, dtype=np.float32)[:, None])
+    / np.array(STD, dtype=np.float32)[:, None]
+)
 
-@lru_cache(maxsize=1)
-def get_model():
-    weights = MobileNet_V3_Large_Weights.IMAGENET1K_V2
-    model = mobilenet_v3_large(weights=weights)
+
+BACKENDS = ("torch", "compile", "torchscript", "onnx", "int8", "int8-dynamic")
+ONNX_FILENAME = "mobilenet_v3_large.onnx"
+TORCHSCRIPT_FILENAME = "mobilenet_v3_large.torchscript.pt"
+INT8_FILENAME = "mobilenet_v3_large.int8.torchscript.pt"
+
+
+def load_eager_model() -> torch.nn.Module:
+    model = mobilenet_v3_large(weights=MobileNet_V3_Large_Weights.IMAGENET1K_V2)
     model.eval()
+    return model
+
+
+def set_quantized_engine() -> str:
+    """Select the INT8 kernel library: CLASSIFIER_QUANT_ENGINE, else x86/fbgemm or qnnpack (ARM)."""
+    supported = torch.backends.quantized.supported_engines
+    engine = get_settings().classifier_quant_engine
+    if not engine:
+        engine = next((e for e in ("x86", "fbgemm", "qnnpack") if e in supported), supported[0])
+    torch.backends.quantized.engine = engine
+    return engine
+
+
+class OnnxModel:
+    """ONNX Runtime session with the same call signature as the torch module."""
+
+    def __init__(self, path: str) -> None:
+        import onnxruntime as ort
+
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(path, opts, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, batch: torch.Tensor) -> torch.Tensor:
+        (logits,) = self.session.run(None, {self.input_name: batch.contiguous().numpy()})
+        return torch.from_numpy(logits)
+
+
+def _artifact(filename: str) -> str:
+    path = os.path.join(get_settings().classifier_model_dir, filename)
+    if not os.path.isfile(path):
+        script = "quantize_model --images <calibration dir>" if filename == INT8_FILENAME else "export_model"
+        raise FileNotFoundError(f"{path} not found; run `python -m scripts.{script}` first.")
+    return path
+
+
+@lru_cache(maxsize=len(BACKENDS))
+def get_model(backend: str | None = None):
+    """Return (model, weights) for CLASSIFIER_BACKEND (or the given backend).
+
+    Every backend is callable on a (N, 3, 224, 224) float tensor and returns
+    ImageNet logits, so callers do not care which one is loaded.
+    """
+    backend = (backend or get_settings().classifier_backend).lower()
+    weights = MobileNet_V3_Large_Weights.IMAGENET1K_V2
+    if backend == "onnx":
+        model = OnnxModel(_artifact(ONNX_FILENAME))
+    elif backend == "torchscript":
+        model = torch.jit.load(_artifact(TORCHSCRIPT_FILENAME), map_location="cpu").eval()
+    elif backend == "int8":
+        # Statically quantized, calibrated by scripts/quantize_model.py
+        set_quantized_engine()
+        model = torch.jit.load(_artifact(INT8_FILENAME), map_location="cpu").eval()
+    elif backend == "int8-dynamic":
+        # No calibration needed, but only the classifier's Linear layers are quantized
+        set_quantized_engine()
+        model = torch.ao.quantization.quantize_dynamic(load_eager_model(), {torch.nn.Linear}, dtype=torch.qint8)
+    elif backend == "compile":
+        model = torch.compile(load_eager_model())
+    elif backend == "torch":
+        model = load_eager_model()
+    else:
+        raise ValueError(f"Unknown CLASSIFIER_BACKEND {backend!r}; expected one of {', '.join(BACKENDS)}")
     return model, weights
 
 
+def decode_image(image_bytes: bytes) -> Image.Image:
+    """Decode to RGB, upright per EXIF, at no more resolution than the model needs.
+
+    For JPEGs, draft mode lets libjpeg decode at 1/2, 1/4 or 1/8 scale while
+    keeping the short side >= RESIZE_SIZE, which is most of the cost on 12 MP photos.
+    """
+    img = Image.open(io.BytesIO(image_bytes))
+    if img.format == "JPEG":
+        w, h = img.size
+        scale = RESIZE_SIZE / min(w, h)
+        if scale < 1:
+            img.draft("RGB", (int(w * scale) + 1, int(h * scale) + 1))
+    img = ImageOps.exif_transpose(img)
+    return img.convert("RGB")
+
+
+def prepare(image_bytes: bytes) -> np.ndarray:
+    """Decode one image to the (224, 224, 3) uint8 model crop.
+
+    Resize-to-256 and centre-crop-224 are fused into a single resample of the
+    crop region. This is the expensive, per-image part; to_batch normalises.
+    """
+    img = decode_image(image_bytes)
+    w, h = img.size
+    side = min(w, h) * INPUT_SIZE / RESIZE_SIZE
+    left, top = (w - side) / 2, (h - side) / 2
+    img = img.resize(
+        (INPUT_SIZE, INPUT_SIZE), Image.Resampling.BILINEAR, box=(left, top, left + side, top + side)
+    )
+    return np.asarray(img)
+
+
+def to_batch(crops: list[np.ndarray]) -> torch.Tensor:
+    """Normalise prepared crops straight into the rows of one preallocated (N, 3, 224, 224) tensor."""
+    batch = torch.empty((len(crops), 3, INPUT_SIZE, INPUT_SIZE), dtype=torch.float32)
+    view = batch.numpy()
+    for row, pixels in zip(view, crops):
+        for c in range(3):
+            np.take(_NORMALIZE_LUT[c], pixels[:, :, c], out=row[c])
+    return batch
+
+
+def preprocess(image_bytes: bytes) -> torch.Tensor:
+    """Decode and normalise one image to a (3, 224, 224) tensor."""
+    return to_batch([prepare(image_bytes)])[0]
+
+
+def preprocess_reference(image_bytes: bytes) -> torch.Tensor:
+    """The original torchvision path, kept for parity checks and benchmarks."""
+    return PREPROCESS(Image.open(io.BytesIO(image_bytes)).convert("RGB"))
+
+
+def classify_batch(
+    tensors: torch.Tensor | list[torch.Tensor], backend: str | None = None
+) -> list[tuple[str, float]]:
+    """One forward pass over preprocessed images, given as an (N, 3, 224, 224) batch or a list
+    of (3, 224, 224) tensors; returns (label, confidence %) per image."""
+    model, weights = get_model(backend)
+    batch = tensors if isinstance(tensors, torch.Tensor) else torch.stack(tensors)
+    with torch.inference_mode():
+        logits = model(batch)
+        probs = torch.softmax(logits, dim=1)
+    top_probs, top_idx = probs.max(dim=1)
+    categories = weights.meta["categories"]
+    return [(categories[i], p * 100) for i, p in zip(top_idx.tolist(), top_probs.tolist())]
+
+
+def classify_crops(crops: list[np.ndarray], backend: str | None = None) -> list[tuple[str, float]]:
+    """classify_batch over prepared crops, normalised into one batch tensor without a stack copy."""
+    return classify_batch(to_batch(crops), backend)
+
+
 def run_mobilenet(image_bytes: bytes) -> tuple[str, float]:
-    model, weights = get_model()
-    img = Image.open(io.BytesIO(image_bytes)).convert("RGB")
-    tensor = PREPROCESS(img).unsqueeze(0)
-    with torch.no_grad():
-        logits = model(tensor)
-        probs = torch.softmax(logits, dim=1)[0]
-    top_idx = probs.argmax().item()
-    confidence = probs[top_idx].item() * 100
-    return weights.meta["categories"][top_idx], confidence
+    return classify_crops([prepare(image_bytes)])[0]
@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable
+
+from config import get_settings
+from services import species_cache
+from services.iucn import get_iucn_habitats, get_iucn_species, get_iucn_threats
+from services.openai_species import fetch_species_info_openai
+
+logger = logging.getLogger(__name__)
+
+
+def _openai_default() -> dict:
+    return {
+        "population": "Unknown",
+        "habitat": "Unknown",
+        "trend": "Unknown",
+        "threats": [],
+        "description": "",
+        "threat_score": None,
+    }
+
+
+def _openai_cacheable(info: dict) -> bool:
+    # Quota errors and missing keys come back as all-"Unknown"; don't pin those.
+    if info.get("_quota_exceeded"):
+        return False
+    return any(info.get(k) not in (None, "", "Unknown", []) for k in ("population", "habitat", "threats", "description"))
+
+
+def _iucn_cacheable(value: Any) -> bool:
+    # Upstream failures raise IUCNUnavailable and never reach the cache, so an
+    # empty value here is a genuinely empty `result`. Without a key every
+    # lookup is None without asking the API; don't pin those.
+    return bool(get_settings().iucn_api_key)
+
+
+async def cached_openai_info(name: str, sci: str, api_key: str | None) -> dict:
+    return await species_cache.get_or_fetch(
+        "openai", sci or name, lambda: fetch_species_info_openai(name, sci, api_key=api_key), _openai_cacheable
+    )
+
+
+async def cached_iucn_species(sci: str) -> dict | None:
+    return await species_cache.get_or_fetch("iucn", sci, lambda: get_iucn_species(sci), _iucn_cacheable)
+
+
+async def cached_iucn_threats(sci: str) -> list[str]:
+    return await species_cache.get_or_fetch("threats", sci, lambda: get_iucn_threats(sci), _iucn_cacheable)
+
+
+async def cached_iucn_habitats(sci: str) -> list[str]:
+    return await species_cache.get_or_fetch("habitats", sci, lambda: get_iucn_habitats(sci), _iucn_cacheable)
+
+
+async def gather_with_deadline(
+    calls: dict[str, Awaitable[Any]],
+    timeout: float,
+    defaults: dict[str, Any],
+    on_result: Callable[[str, Any], None] | None = None,
+) -> tuple[dict[str, Any], list[str]]:
+    """Run named awaitables concurrently under one overall deadline.
+
+    Returns (results, missing): calls that raised or did not finish in time are
+    cancelled and replaced by defaults[name], and their names listed in missing.
+    on_result(name, value) is called as each call succeeds, before the rest finish.
+    """
+    tasks = {name: asyncio.ensure_future(aw) for name, aw in calls.items()}
+    if on_result is not None:
+        def _report(name: str, task: asyncio.Future) -> None:
+            if not task.cancelled() and task.exception() is None:
+                on_result(name, task.result())
+
+        for name, task in tasks.items():
+            task.add_done_callback(lambda t, name=name: _report(name, t))
+    if tasks:
+        await asyncio.wait(tasks.values(), timeout=max(0.0, timeout))
+    results: dict[str, Any] = {}
+    missing: list[str] = []
+    for name, task in tasks.items():
+        if not task.done():
+            task.cancel()
+            missing.append(name)
+            results[name] = defaults.get(name)
+        elif task.cancelled() or task.exception() is not None:
+            if not task.cancelled():
+                logger.warning("Enrichment call %s failed: %s", name, task.exception())
+            missing.append(name)
+            results[name] = defaults.get(name)
+        else:
+            results[name] = task.result()
+    return results, missing
+
+
+async def enrich_species(
+    name: str,
+    sci: str,
+    *,
+    openai_key: str | None,
+    timeout: float,
+    extra: dict[str, Awaitable[Any]] | None = None,
+    extra_defaults: dict[str, Any] | None = None,
+    on_result: Callable[[str, Any], None] | None = None,
+) -> dict[str, Any]:
+    """Fetch OpenAI facts and IUCN species/threats/habitats for one species concurrently.
+
+    `extra` lets callers fan out their own lookups (e.g. the nearby-sightings
+    count) under the same deadline. The result has keys openai, iucn, threats,
+    habitats plus any extra names, and "missing" listing what fell back to defaults.
+    on_result is passed to gather_with_deadline for callers that stream partial results.
+    """
+    started = time.perf_counter()
+    calls: dict[str, Awaitable[Any]] = {
+        "openai": cached_openai_info(name, sci, openai_key),
+        "iucn": cached_iucn_species(sci),
+        "threats": cached_iucn_threats(sci),
+        "habitats": cached_iucn_habitats(sci),
+        **(extra or {}),
+    }
+    defaults: dict[str, Any] = {
+        "openai": _openai_default(),
+        "iucn": None,
+        "threats": [],
+        "habitats": [],
+        **(extra_defaults or {}),
+    }
+    results, missing = await gather_with_deadline(calls, timeout, defaults, on_result)
+    if missing:
+        logger.info(
+            "Enrichment for %s returned partial results after %.1fs; missing: %s",
+            sci, time.perf_counter() - started, ", ".join(missing),
+        )
+    results["missing"] = missing
+    return results
@@ -0,0 +1,92 @@
+"""Dedicated, bounded thread pool for CPU-bound model work.
+
+Decode/preprocess and forward passes run here instead of the loop's default
+executor, so a burst of scans cannot starve other run_in_executor users.
+Admission is capped at INFERENCE_MAX_PENDING images in flight; beyond that
+callers get ExecutorSaturated, which main.py turns into 503 + Retry-After.
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, TypeVar
+
+import torch
+
+import metrics
+from config import get_settings
+
+T = TypeVar("T")
+
+
+class ExecutorSaturated(Exception):
+    def __init__(self, retry_after: int) -> None:
+        super().__init__("Inference queue is full")
+        self.retry_after = retry_after
+
+
+class InferenceExecutor:
+    def __init__(self, workers: int, max_pending: int, torch_threads: int, retry_after: int) -> None:
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+        self.torch_threads = torch_threads
+        self.retry_after = retry_after
+        self.pending = 0
+        self.rejected = 0
+        self.wait_time = metrics.LatencyHistogram()
+        self._pool: ThreadPoolExecutor | None = None
+
+    def start(self) -> None:
+        if self._pool is not None:
+            return
+        if self.torch_threads > 0:
+            torch.set_num_threads(self.torch_threads)
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    @asynccontextmanager
+    async def admit(self, images: int = 1) -> AsyncIterator[None]:
+        """Reserve slots for `images` images, or raise ExecutorSaturated when they do not fit."""
+        if self.pending + images > self.max_pending:
+            self.rejected += 1
+            raise ExecutorSaturated(self.retry_after)
+        self.pending += images
+        try:
+            yield
+        finally:
+            self.pending -= images
+
+    async def run(self, fn: Callable[..., T], *args) -> T:
+        submitted = time.perf_counter()
+
+        def timed() -> T:
+            self.wait_time.observe(time.perf_counter() - submitted)
+            return fn(*args)
+
+        if self._pool is None:
+            self.start()
+        return await asyncio.get_running_loop().run_in_executor(self._pool, timed)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "torch_threads": torch.get_num_threads(),
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "rejected": self.rejected,
+            "wait_time": self.wait_time.snapshot(),
+        }
+
+
+_settings = get_settings()
+inference_executor = InferenceExecutor(
+    workers=_settings.inference_workers,
+    max_pending=_settings.inference_max_pending,
+    torch_threads=_settings.inference_torch_threads,
+    retry_after=_settings.inference_retry_after,
+)
+metrics.register("inference_executor", inference_executor.stats)
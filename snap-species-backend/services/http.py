@@ -0,0 +1,85 @@
+"""Application-scoped httpx clients, one per upstream.
+
+Clients are opened in main.lifespan and closed on shutdown so keep-alive
+connections (and their TLS sessions) are reused across requests. Each
+client records request latency per upstream under GET /metrics.
+"""
+import importlib.util
+import time
+
+import httpx
+
+import metrics
+from config import get_settings
+
+# HTTP/2 needs the optional `h2` package (pip install httpx[http2]).
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# Read timeout per upstream, seconds; connect is capped separately.
+UPSTREAM_TIMEOUTS = {
+    "iucn": 15.0,
+    "animal_detect": 30.0,
+    "openai": 30.0,
+}
+
+_clients: dict[str, httpx.AsyncClient] = {}
+_latency = {name: metrics.LatencyHistogram() for name in UPSTREAM_TIMEOUTS}
+_errors = {name: 0 for name in UPSTREAM_TIMEOUTS}
+
+
+def _hooks(name: str) -> dict:
+    async def on_request(request: httpx.Request) -> None:
+        request.extensions["started"] = time.perf_counter()
+
+    async def on_response(response: httpx.Response) -> None:
+        started = response.request.extensions.get("started")
+        if started is not None:
+            _latency[name].observe(time.perf_counter() - started)
+        if response.status_code >= 500 or response.status_code == 429:
+            _errors[name] += 1
+
+    return {"request": [on_request], "response": [on_response]}
+
+
+def _create_client(name: str) -> httpx.AsyncClient:
+    settings = get_settings()
+    return httpx.AsyncClient(
+        http2=HTTP2_AVAILABLE,
+        timeout=httpx.Timeout(UPSTREAM_TIMEOUTS[name], connect=settings.http_connect_timeout),
+        limits=httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive,
+            keepalive_expiry=settings.http_keepalive_expiry,
+        ),
+        event_hooks=_hooks(name),
+    )
+
+
+def get_client(name: str) -> httpx.AsyncClient:
+    """Shared client for an upstream; created on first use outside the app lifespan."""
+    client = _clients.get(name)
+    if client is None or client.is_closed:
+        client = _clients[name] = _create_client(name)
+    return client
+
+
+async def start_clients() -> None:
+    for name in UPSTREAM_TIMEOUTS:
+        get_client(name)
+
+
+async def close_clients() -> None:
+    clients = list(_clients.values())
+    _clients.clear()
+    for client in clients:
+        await client.aclose()
+
+
+def upstream_metrics() -> dict:
+    return {
+        name: {**_latency[name].snapshot(), "errors": _errors[name]}
+        for name in UPSTREAM_TIMEOUTS
+    } | {"http2": HTTP2_AVAILABLE}
+
+
+metrics.register("upstreams", upstream_metrics)
@@ -0,0 +1,113 @@
+"""Identification results keyed by uploaded image content.
+
+Exact re-uploads hit on the SHA-256 of the bytes. Re-encoded or resized
+copies (re-shares, messenger recompression) hit on a 64-bit difference hash
+of the model crop within IMAGE_CACHE_PHASH_DISTANCE bits, when
+IMAGE_CACHE_PHASH is on. That is off by default: a different photo with a
+similar framing (the next frame of a burst) can share a hash and would get
+this one's identification.
+
+Near lookups go through a band index: the hash is split into PHASH_BANDS
+16-bit bands, and any hash within PHASH_BANDS - 1 bits shares at least one
+band with the query, so only those buckets are compared.
+"""
+import hashlib
+from collections import deque
+
+import numpy as np
+from PIL import Image
+
+import metrics
+from cache import TTLCache
+from config import get_settings
+
+Identification = tuple[str, str, float]
+
+_settings = get_settings()
+_by_digest: TTLCache[Identification] = TTLCache(maxsize=_settings.image_cache_size, ttl=_settings.image_cache_ttl)
+_by_phash: TTLCache[Identification] = TTLCache(maxsize=_settings.image_cache_size, ttl=_settings.image_cache_ttl)
+_stats = {"exact_hits": 0, "near_hits": 0, "misses": 0}
+
+PHASH_BANDS = 4
+_BAND_BITS = 64 // PHASH_BANDS
+# Hashes per bucket; older ones fall out (they have usually expired from _by_phash anyway).
+_BUCKET_SIZE = 32
+_bands: dict[tuple[int, int], deque[int]] = {}
+
+
+def _band_keys(phash: int) -> list[tuple[int, int]]:
+    mask = (1 << _BAND_BITS) - 1
+    return [(band, (phash >> (band * _BAND_BITS)) & mask) for band in range(PHASH_BANDS)]
+
+
+def content_digest(image_bytes: bytes) -> str:
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+def perceptual_hash(crop: np.ndarray) -> int:
+    """64-bit dHash: sign of horizontal gradients on a 9x8 grayscale thumbnail.
+
+    Takes the model crop from classification.prepare, so a cache miss reuses
+    the one decode for classification.
+    """
+    img = Image.fromarray(crop).convert("L").resize((9, 8), Image.Resampling.BILINEAR)
+    px = img.tobytes()
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (px[row * 9 + col] < px[row * 9 + col + 1])
+    return bits
+
+
+def get_exact(digest: str) -> Identification | None:
+    hit = _by_digest.get(digest)
+    if hit is not None:
+        _stats["exact_hits"] += 1
+    return hit
+
+
+def get_near(phash: int) -> Identification | None:
+    """Closest cached identification within IMAGE_CACHE_PHASH_DISTANCE bits (at most PHASH_BANDS - 1)."""
+    hit = _by_phash.get(phash)
+    max_distance = min(get_settings().image_cache_phash_distance, PHASH_BANDS - 1)
+    if hit is None and max_distance > 0:
+        best = max_distance + 1
+        candidates = {other for key in _band_keys(phash) for other in _bands.get(key, ())}
+        for other in candidates:
+            distance = (other ^ phash).bit_count()
+            if distance < best:
+                result = _by_phash.get(other)
+                if result is not None:
+                    best, hit = distance, result
+    if hit is not None:
+        _stats["near_hits"] += 1
+    return hit
+
+
+def record_miss() -> None:
+    _stats["misses"] += 1
+
+
+def put(digest: str, phash: int | None, result: Identification) -> None:
+    ttl = get_settings().image_cache_ttl
+    _by_digest.set(digest, result, ttl=ttl)
+    if phash is not None:
+        _by_phash.set(phash, result, ttl=ttl)
+        for key in _band_keys(phash):
+            bucket = _bands.setdefault(key, deque(maxlen=_BUCKET_SIZE))
+            if phash not in bucket:
+                bucket.append(phash)
+
+
+def cache_stats() -> dict:
+    hits = _stats["exact_hits"] + _stats["near_hits"]
+    total = hits + _stats["misses"]
+    return {
+        **_stats,
+        "hit_rate": round(hits / total, 3) if total else 0.0,
+        "entries": len(_by_digest),
+        "maxsize": _by_digest.maxsize,
+    }
+
+
+metrics.register("image_cache", cache_stats)
@@ -0,0 +1,141 @@
+"""In-process MobileNet inference with dynamic micro-batching.
+
+Concurrent callers are collected for up to INFERENCE_MAX_WAIT_MS or
+INFERENCE_MAX_BATCH images and classified in a single forward pass; each
+caller's future is resolved with its own (label, confidence). Callers queue
+prepared uint8 crops; the batch is normalised straight into one tensor.
+"""
+import asyncio
+import logging
+from collections import Counter
+
+import numpy as np
+
+import metrics
+from config import get_settings
+from services.classification import classify_crops, get_model, prepare
+from services.executor import InferenceExecutor, inference_executor
+
+logger = logging.getLogger(__name__)
+
+
+class BatchingEngine:
+    def __init__(self, max_batch: int, max_wait_ms: float, executor: InferenceExecutor) -> None:
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.executor = executor
+        self._queue: asyncio.Queue[tuple[np.ndarray, asyncio.Future]] | None = None
+        self._worker: asyncio.Task | None = None
+        # The batch _run is collecting or classifying, so stop() can fail it too.
+        self._inflight: list[tuple[np.ndarray, asyncio.Future]] = []
+        self.batches = 0
+        self.images = 0
+        self.batch_sizes: Counter[int] = Counter()
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None and not self._worker.done()
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        await self.executor.run(get_model)  # load weights before the first request
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Cancel the worker and fail every pending future, in-flight batch included."""
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        pending, self._inflight = self._inflight, []
+        while self._queue and not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        for _, fut in pending:
+            if not fut.done():
+                fut.set_exception(RuntimeError("Inference engine stopped"))
+
+    async def classify_crop(self, crop: np.ndarray) -> tuple[str, float]:
+        if not self.running:
+            raise RuntimeError("Inference engine stopped")
+        fut = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((crop, fut))  # unbounded; no await between the check and the put
+        return await fut
+
+    async def classify(self, image_bytes: bytes) -> tuple[str, float]:
+        crop = await self.executor.run(prepare, image_bytes)
+        return await self.classify_crop(crop)
+
+    async def _collect(self) -> list[tuple[np.ndarray, asyncio.Future]]:
+        loop = asyncio.get_running_loop()
+        self._inflight = batch = []
+        batch.append(await self._queue.get())
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = [(c, f) for c, f in await self._collect() if not f.cancelled()]
+            if not batch:
+                continue
+            try:
+                results = await self.executor.run(classify_crops, [c for c, _ in batch])
+            except Exception as e:
+                logger.exception("Batched inference failed")
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+            self.batches += 1
+            self.images += len(batch)
+            self.batch_sizes[len(batch)] += 1
+            for (_, fut), result in zip(batch, results):
+                if not fut.done():
+                    fut.set_result(result)
+            self._inflight = []
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "batches": self.batches,
+            "images": self.images,
+            "avg_batch": round(self.images / self.batches, 2) if self.batches else 0.0,
+            "batch_sizes": dict(sorted(self.batch_sizes.items())),
+        }
+
+
+_settings = get_settings()
+engine = BatchingEngine(_settings.inference_max_batch, _settings.inference_max_wait_ms, inference_executor)
+metrics.register("inference", engine.stats)
+
+
+async def classify_image(image: bytes | np.ndarray) -> tuple[str, float]:
+    """Classify raw bytes or a crop from classification.prepare, through the batching engine
+    or directly when it is not running (scripts, batching off).
+
+    Raises ExecutorSaturated when INFERENCE_MAX_PENDING images are already in flight.
+    """
+    async with inference_executor.admit():
+        crop = image if isinstance(image, np.ndarray) else await inference_executor.run(prepare, image)
+        if engine.running:
+            return await engine.classify_crop(crop)
+        return (await inference_executor.run(classify_crops, [crop]))[0]
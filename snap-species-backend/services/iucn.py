@@ -1,11 +1,15 @@
 from __future__ import annotations
 
-import httpx
+import asyncio
+from typing import Callable, TypeVar
 
 from config import get_settings
+from services.http import get_client
 
 IUCN_BASE = "https://apiv3.iucnredlist.org/api/v3"
 
+T = TypeVar("T")
+
 ENDANGERED_STATUSES = {"CR", "EN", "VU"}
 
 CATEGORY_TO_STATUS = {
@@ -56,31 +60,31 @@ def _encode_name(name: str) -> str:
     return name.strip().replace(" ", "%20")
 
 
-async def _iucn_get(path: str) -> dict | list | None:
+class IUCNUnavailable(Exception):
+    """The Red List API did not answer (transport error, 429, 5xx, unexpected body).
+
+    Distinct from "not found" (an empty `result`), so callers do not cache it.
+    """
+
+
+async def _iucn_get(path: str) -> dict | None:
+    """Parsed response, or None without an API key; raises IUCNUnavailable when there is no answer."""
     key = get_settings().iucn_api_key
     if not key:
         return None
     path = path if path.startswith("/") else f"/{path}"
     url = f"{IUCN_BASE}{path}?token={key}"
-    async with httpx.AsyncClient(timeout=15) as client:
-        try:
-            resp = await client.get(url)
-            resp.raise_for_status()
-            return resp.json()
-        except Exception:
-            return None
-
-
-async def get_iucn_species(scientific_name: str) -> dict | None:
-    if not scientific_name or not scientific_name.strip():
-        return None
-    for name in (scientific_name.strip(), _genus_species(scientific_name)):
-        if not name:
-            continue
-        data = await _iucn_get(f"/species/{_encode_name(name)}")
-        if data and data.get("result"):
-            return data["result"][0]
-    return None
+    try:
+        resp = await get_client("iucn").get(url)
+        if resp.status_code == 404:
+            return {"result": []}
+        resp.raise_for_status()
+        data = resp.json()
+    except Exception as e:
+        raise IUCNUnavailable(f"{path}: {e}") from e
+    if not isinstance(data, dict) or not isinstance(data.get("result"), list):
+        raise IUCNUnavailable(f"{path}: unexpected response {str(data)[:200]}")
+    return data
 
 
 def _genus_species(scientific_name: str) -> str | None:
@@ -90,46 +94,69 @@ def _genus_species(scientific_name: str) -> str | None:
     return None
 
 
-async def get_iucn_threats(scientific_name: str) -> list[str]:
-    if not scientific_name or not scientific_name.strip():
-        return []
+def _candidate_names(scientific_name: str) -> list[str]:
+    """Full name first, then genus + species; deduplicated (binomials yield one)."""
+    out: list[str] = []
     for name in (scientific_name.strip(), _genus_species(scientific_name)):
-        if not name:
-            continue
-        data = await _iucn_get(f"/species/threats/{_encode_name(name)}")
-        if not data or not isinstance(data.get("result"), list):
-            continue
-        out = []
-        for row in data["result"]:
-            if isinstance(row, dict):
-                if row.get("title"):
-                    out.append(str(row["title"]))
-                elif row.get("code"):
-                    out.append(str(row["code"]))
-        if out:
-            return out[:15]
-    return []
+        if name and name not in out:
+            out.append(name)
+    return out
 
 
-async def get_iucn_habitats(scientific_name: str) -> list[str]:
+async def _first_hit(scientific_name: str, path: str, extract: Callable[[dict | None], T | None]) -> T | None:
+    """Query every candidate name concurrently; return the first hit in preference order.
+
+    Raises IUCNUnavailable if a candidate ahead of the first hit (or any, when
+    nothing was found) could not be fetched, so a miss is only reported when
+    every name genuinely came back empty.
+    """
     if not scientific_name or not scientific_name.strip():
-        return []
-    for name in (scientific_name.strip(), _genus_species(scientific_name)):
-        if not name:
-            continue
-        data = await _iucn_get(f"/species/habitats/{_encode_name(name)}")
-        if not data or not isinstance(data.get("result"), list):
-            continue
+        return None
+    names = _candidate_names(scientific_name)
+    responses = await asyncio.gather(
+        *(_iucn_get(f"{path}/{_encode_name(n)}") for n in names), return_exceptions=True
+    )
+    for data in responses:
+        if isinstance(data, BaseException):
+            raise data
+        hit = extract(data)
+        if hit:
+            return hit
+    return None
+
+
+def _species_result(data: dict | None) -> dict | None:
+    if isinstance(data, dict) and data.get("result"):
+        return data["result"][0]
+    return None
+
+
+def _result_titles(field: str) -> Callable[[dict | None], list[str] | None]:
+    def extract(data: dict | None) -> list[str] | None:
+        if not isinstance(data, dict) or not isinstance(data.get("result"), list):
+            return None
         out = []
         for row in data["result"]:
             if isinstance(row, dict):
-                if row.get("habitat"):
-                    out.append(str(row["habitat"]))
+                if row.get(field):
+                    out.append(str(row[field]))
                 elif row.get("code"):
                     out.append(str(row["code"]))
-        if out:
-            return out
-    return []
+        return out
+    return extract
+
+
+async def get_iucn_species(scientific_name: str) -> dict | None:
+    return await _first_hit(scientific_name, "/species", _species_result)
+
+
+async def get_iucn_threats(scientific_name: str) -> list[str]:
+    threats = await _first_hit(scientific_name, "/species/threats", _result_titles("title"))
+    return (threats or [])[:15]
+
+
+async def get_iucn_habitats(scientific_name: str) -> list[str]:
+    return await _first_hit(scientific_name, "/species/habitats", _result_titles("habitat")) or []
 
 
 def population_from_result(result: dict) -> str:
@@ -0,0 +1,218 @@
+"""In-memory leaderboard snapshots for all-time, this month and this week.
+
+A background task rebuilds every window at most once per
+LEADERBOARD_REFRESH_INTERVAL after a local write, and at least once per
+LEADERBOARD_MAX_AGE regardless (other workers' writes). Requests only read
+the current snapshot: the top list is pre-serialised per limit and carries
+an ETag, and a user's rank is a bisect over the sorted ranking keys.
+"""
+import asyncio
+import bisect
+import hashlib
+import logging
+import time
+from dataclasses import dataclass, field
+
+import asyncpg
+
+import metrics
+from config import get_settings
+from database import acquire
+from schemas import LeaderboardEntryResponse
+
+logger = logging.getLogger(__name__)
+
+WINDOWS = ("all", "month", "week")
+MAX_LIMIT = 500
+
+_ALL_TIME = """
+    SELECT u.id, u.name, u.created_at,
+           st.species, st.endangered_species, st.avg_threat_score
+    FROM user_stats st
+    JOIN users u ON u.id = st.user_id
+    WHERE st.sightings > 0
+"""
+
+# Users without sightings rank last on the all-time board, as they always have.
+_NO_SIGHTINGS = """
+    SELECT u.id, u.name, u.created_at,
+           0 AS species, 0 AS endangered_species, 0.0 AS avg_threat_score
+    FROM users u
+    WHERE NOT EXISTS (SELECT 1 FROM user_stats st WHERE st.user_id = u.id AND st.sightings > 0)
+    ORDER BY u.id
+    LIMIT $1
+"""
+
+# Calendar month / ISO week in the database's time zone; a range scan on idx_sightings_feed.
+_WINDOWED = """
+    SELECT u.id, u.name, u.created_at,
+           w.species, w.endangered_species, w.avg_threat_score
+    FROM (
+        SELECT user_id,
+               COUNT(DISTINCT LOWER(TRIM(sci))) AS species,
+               COUNT(DISTINCT CASE WHEN status IN ('CR', 'EN', 'VU') THEN LOWER(TRIM(sci)) END) AS endangered_species,
+               AVG(threat_score) AS avg_threat_score
+        FROM sightings
+        WHERE created_at >= date_trunc('{unit}', now())
+        GROUP BY user_id
+    ) w
+    JOIN users u ON u.id = w.user_id
+"""
+
+_MONTHS = "Jan Feb Mar Apr May Jun Jul Aug Sep Oct Nov Dec".split()
+
+
+def _joined(created) -> str:
+    if created is None:
+        return "—"
+    return f"{_MONTHS[created.month - 1]} {created.year}"
+
+
+def _rank_key(row) -> tuple:
+    return (-int(row["endangered_species"] or 0), -float(row["avg_threat_score"] or 0), row["id"])
+
+
+def _entry(rank: int, row) -> LeaderboardEntryResponse:
+    endangered = int(row["endangered_species"] or 0)
+    avg_score = float(row["avg_threat_score"] or 0)
+    return LeaderboardEntryResponse(
+        rank=rank,
+        name=row["name"] or "Anonymous",
+        score=endangered * 100 + round(avg_score),
+        species=int(row["species"] or 0),
+        endangered_species=endangered,
+        avg_threat_score=round(avg_score, 1),
+        joined=_joined(row["created_at"]),
+    )
+
+
+@dataclass
+class Snapshot:
+    window: str
+    version: int
+    built_at: float
+    keys: list[tuple]  # _rank_key of every ranked user, ascending = best first
+    by_user: dict[int, asyncpg.Record]
+    top: list[LeaderboardEntryResponse]
+    _bodies: dict[int, tuple[bytes, str]] = field(default_factory=dict)
+
+    def body(self, limit: int) -> tuple[bytes, str]:
+        """Top `limit` entries as a JSON array plus its ETag, serialised once per limit.
+
+        The ETag hashes the content, so it agrees across workers and survives
+        rebuilds that change nothing.
+        """
+        cached = self._bodies.get(limit)
+        if cached is None:
+            data = b"[" + b",".join(e.model_dump_json().encode() for e in self.top[:limit]) + b"]"
+            cached = data, f'"{hashlib.blake2b(data, digest_size=12).hexdigest()}"'
+            self._bodies[limit] = cached
+        return cached
+
+    def rank_of(self, user_id: int) -> int | None:
+        row = self.by_user.get(user_id)
+        if row is None:
+            return None
+        return bisect.bisect_left(self.keys, _rank_key(row)) + 1
+
+
+class LeaderboardSnapshots:
+    def __init__(self, refresh_interval: float, max_age: float) -> None:
+        self.refresh_interval = max(0.0, refresh_interval)
+        self.max_age = max(self.refresh_interval, max_age)
+        self.rebuilds = 0
+        self.build_time = metrics.LatencyHistogram()
+        self._snapshots: dict[str, Snapshot] = {}
+        self._dirty = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def mark_dirty(self) -> None:
+        """Called after a sighting is written; the next rebuild happens within refresh_interval."""
+        self._dirty.set()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.rebuild()
+            except Exception:
+                logger.exception("Leaderboard rebuild failed")
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await asyncio.wait_for(self._dirty.wait(), self.max_age - self.refresh_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def rebuild(self) -> None:
+        async with self._lock:
+            self._dirty.clear()
+            started = time.perf_counter()
+            async with acquire() as conn:
+                results = {
+                    "all": await conn.fetch(_ALL_TIME),
+                    "month": await conn.fetch(_WINDOWED.format(unit="month")),
+                    "week": await conn.fetch(_WINDOWED.format(unit="week")),
+                }
+                ranked_all = len(results["all"])
+                if ranked_all < MAX_LIMIT:
+                    results["all"] += await conn.fetch(_NO_SIGHTINGS, MAX_LIMIT - ranked_all)
+            for window, rows in results.items():
+                rows = sorted(rows, key=_rank_key)
+                previous = self._snapshots.get(window)
+                self._snapshots[window] = Snapshot(
+                    window=window,
+                    version=previous.version + 1 if previous else 1,
+                    built_at=time.time(),
+                    keys=[_rank_key(row) for row in rows],
+                    by_user={row["id"]: row for row in rows},
+                    top=[_entry(rank, row) for rank, row in enumerate(rows[:MAX_LIMIT], start=1)],
+                )
+            self.rebuilds += 1
+            self.build_time.observe(time.perf_counter() - started)
+
+    async def get(self, window: str) -> Snapshot:
+        snapshot = self._snapshots.get(window)
+        if snapshot is None:
+            await self.rebuild()
+            snapshot = self._snapshots[window]
+        return snapshot
+
+    async def my_rank(self, window: str, user_id: int) -> tuple[int, int, LeaderboardEntryResponse | None]:
+        """(rank, total ranked, entry) for user_id; rank 0 and no entry if they are not on the board."""
+        snapshot = await self.get(window)
+        rank = snapshot.rank_of(user_id)
+        if rank is None:
+            return 0, len(snapshot.keys), None
+        return rank, len(snapshot.keys), _entry(rank, snapshot.by_user[user_id])
+
+    def stats(self) -> dict:
+        return {
+            "rebuilds": self.rebuilds,
+            "build_time": self.build_time.snapshot(),
+            "windows": {
+                w: {"version": s.version, "ranked": len(s.keys), "age_s": round(time.time() - s.built_at, 1)}
+                for w, s in self._snapshots.items()
+            },
+        }
+
+
+_settings = get_settings()
+snapshots = LeaderboardSnapshots(
+    refresh_interval=_settings.leaderboard_refresh_interval,
+    max_age=_settings.leaderboard_max_age,
+)
+metrics.register("leaderboard", snapshots.stats)
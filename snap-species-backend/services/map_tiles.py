@@ -0,0 +1,99 @@
+"""Per-tile map data: sighting points at street zoom, clusters below it.
+
+Tiles are Web-Mercator z/x/y. Each tile is one index-backed box query
+(GiST on point(lng, lat)), cached in-process for MAP_TILE_CACHE_TTL and
+dropped early when a sighting lands inside it. At most
+MAP_TILE_QUERY_CONCURRENCY tile queries run at once per process, so a
+viewport of many uncached tiles cannot take the whole connection pool.
+"""
+import asyncio
+
+import metrics
+from cache import TTLCache
+from config import get_settings
+from database import acquire
+from geo import MAX_ZOOM, tile_bounds, tile_for_point
+
+# Clusters are computed on a CLUSTER_GRID x CLUSTER_GRID grid inside each tile.
+CLUSTER_GRID = 8
+
+_settings = get_settings()
+_tiles: TTLCache[list[dict]] = TTLCache(maxsize=_settings.map_tile_cache_size, ttl=_settings.map_tile_cache_ttl)
+metrics.register("map_tiles", _tiles.stats)
+_queries = asyncio.Semaphore(max(1, _settings.map_tile_query_concurrency))
+
+
+def is_clustered(zoom: int) -> bool:
+    return zoom <= get_settings().map_cluster_max_zoom
+
+
+async def _query_points(z: int, x: int, y: int) -> list[dict]:
+    min_lng, min_lat, max_lng, max_lat = tile_bounds(z, x, y)
+    async with acquire() as conn:
+        rows = await conn.fetch(
+            """SELECT s.id, s.user_id, s.name, s.sci, s.status, s.lat, s.lng, s.threat_score, s.created_at,
+                      u.name AS reporter
+               FROM sightings s
+               LEFT JOIN users u ON u.id = s.user_id
+               WHERE point(s.lng, s.lat) <@ box(point($1, $2), point($3, $4))
+               ORDER BY s.created_at DESC
+               LIMIT $5""",
+            min_lng, min_lat, max_lng, max_lat, get_settings().map_tile_point_limit,
+        )
+    return [dict(r) for r in rows]
+
+
+async def _query_clusters(z: int, x: int, y: int) -> list[dict]:
+    min_lng, min_lat, max_lng, max_lat = tile_bounds(z, x, y)
+    cell_w = (max_lng - min_lng) / CLUSTER_GRID
+    cell_h = (max_lat - min_lat) / CLUSTER_GRID
+    async with acquire() as conn:
+        rows = await conn.fetch(
+            """SELECT COUNT(*) AS count,
+                      AVG(lat) AS lat,
+                      AVG(lng) AS lng,
+                      MAX(threat_score) AS max_threat_score,
+                      COUNT(*) FILTER (WHERE status IN ('CR', 'EN', 'VU')) AS endangered
+               FROM sightings
+               WHERE point(lng, lat) <@ box(point($1, $2), point($3, $4))
+               GROUP BY floor((lng - $1) / $5), floor((lat - $2) / $6)""",
+            min_lng, min_lat, max_lng, max_lat, cell_w, cell_h,
+        )
+    tile = f"{z}/{x}/{y}"
+    return [
+        {
+            "lat": float(r["lat"]),
+            "lng": float(r["lng"]),
+            "count": int(r["count"]),
+            "endangered": int(r["endangered"]),
+            "max_threat_score": int(r["max_threat_score"] or 0),
+            "tile": tile,
+        }
+        for r in rows
+    ]
+
+
+async def get_tile(z: int, x: int, y: int) -> list[dict]:
+    """Point rows (as dicts) or cluster dicts for one tile, depending on zoom."""
+    clustered = is_clustered(z)
+    key = ("clusters" if clustered else "points", z, x, y)
+    cached = _tiles.get(key)
+    if cached is not None:
+        return cached
+    async with _queries:
+        data = await (_query_clusters(z, x, y) if clustered else _query_points(z, x, y))
+    _tiles.set(key, data, ttl=get_settings().map_tile_cache_ttl)
+    return data
+
+
+def invalidate_point(lat: float, lng: float) -> None:
+    """Drop every cached tile containing (lat, lng); call after inserting a sighting."""
+    for z in range(MAX_ZOOM + 1):
+        x, y = tile_for_point(lat, lng, z)
+        _tiles.pop(("clusters", z, x, y))
+        _tiles.pop(("points", z, x, y))
+
+
+def invalidate_all() -> None:
+    """Drop every cached tile; cheaper than per-point invalidation after a bulk import."""
+    _tiles.clear()
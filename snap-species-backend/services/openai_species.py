@@ -2,7 +2,7 @@ import json
 import logging
 import os
 
-import httpx
+from services.http import get_client
 
 logger = logging.getLogger(__name__)
 
@@ -96,49 +96,48 @@ async def fetch_species_info_openai(name: str, sci: str, api_key: str | None = N
         '"threats": ["Habitat loss", "Poaching"], "description": "A large cat native to Asia.", "threat_score": 65}'
     )
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            r = await client.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers={"Authorization": f"Bearer {key}", "Content-Type": "application/json"},
-                json={
-                    "model": "gpt-4o-mini",
-                    "messages": [{"role": "user", "content": prompt}],
-                    "max_tokens": 600,
-                },
-            )
-            if r.status_code != 200:
-                if r.status_code == 429:
-                    logger.warning("OpenAI API 429: quota exceeded. Check plan and billing at https://platform.openai.com/account/billing")
-                else:
-                    logger.warning("OpenAI API error %s: %s", r.status_code, r.text[:200])
-                out["_quota_exceeded"] = r.status_code == 429
-                return out
-            data = r.json()
-            content = (data.get("choices") or [{}])[0].get("message", {}).get("content") or ""
-            parsed = _extract_json(content)
-            if isinstance(parsed, dict):
-                if isinstance(parsed.get("population"), str) and parsed["population"].strip():
-                    out["population"] = parsed["population"].strip()
-                if isinstance(parsed.get("habitat"), str) and parsed["habitat"].strip():
-                    out["habitat"] = parsed["habitat"].strip()
-                if isinstance(parsed.get("trend"), str) and parsed["trend"] in ("Increasing", "Stable", "Decreasing", "Unknown"):
-                    out["trend"] = parsed["trend"]
-                if isinstance(parsed.get("threats"), list):
-                    out["threats"] = [str(t).strip() for t in parsed["threats"] if t][:10]
-                if isinstance(parsed.get("description"), str) and parsed["description"].strip():
-                    out["description"] = parsed["description"].strip()
-                t = parsed.get("threat_score")
-                if isinstance(t, int) and 0 <= t <= 100:
-                    out["threat_score"] = t
-                elif isinstance(t, (float, str)):
-                    try:
-                        n = int(float(t))
-                        if 0 <= n <= 100:
-                            out["threat_score"] = n
-                    except (ValueError, TypeError):
-                        pass
+        r = await get_client("openai").post(
+            "https://api.openai.com/v1/chat/completions",
+            headers={"Authorization": f"Bearer {key}", "Content-Type": "application/json"},
+            json={
+                "model": "gpt-4o-mini",
+                "messages": [{"role": "user", "content": prompt}],
+                "max_tokens": 600,
+            },
+        )
+        if r.status_code != 200:
+            if r.status_code == 429:
+                logger.warning("OpenAI API 429: quota exceeded. Check plan and billing at https://platform.openai.com/account/billing")
             else:
-                logger.warning("OpenAI: could not parse JSON from response: %s", content[:200])
+                logger.warning("OpenAI API error %s: %s", r.status_code, r.text[:200])
+            out["_quota_exceeded"] = r.status_code == 429
+            return out
+        data = r.json()
+        content = (data.get("choices") or [{}])[0].get("message", {}).get("content") or ""
+        parsed = _extract_json(content)
+        if isinstance(parsed, dict):
+            if isinstance(parsed.get("population"), str) and parsed["population"].strip():
+                out["population"] = parsed["population"].strip()
+            if isinstance(parsed.get("habitat"), str) and parsed["habitat"].strip():
+                out["habitat"] = parsed["habitat"].strip()
+            if isinstance(parsed.get("trend"), str) and parsed["trend"] in ("Increasing", "Stable", "Decreasing", "Unknown"):
+                out["trend"] = parsed["trend"]
+            if isinstance(parsed.get("threats"), list):
+                out["threats"] = [str(t).strip() for t in parsed["threats"] if t][:10]
+            if isinstance(parsed.get("description"), str) and parsed["description"].strip():
+                out["description"] = parsed["description"].strip()
+            t = parsed.get("threat_score")
+            if isinstance(t, int) and 0 <= t <= 100:
+                out["threat_score"] = t
+            elif isinstance(t, (float, str)):
+                try:
+                    n = int(float(t))
+                    if 0 <= n <= 100:
+                        out["threat_score"] = n
+                except (ValueError, TypeError):
+                    pass
+        else:
+            logger.warning("OpenAI: could not parse JSON from response: %s", content[:200])
     except Exception as e:
         logger.warning("OpenAI request failed: %s", e)
     return out
@@ -0,0 +1,81 @@
+"""bcrypt hashing off the event loop.
+
+Each hash/verify costs ~100-300 ms of CPU at the default cost; run inline it
+stalls every other request on the worker. They run on a small dedicated
+thread pool instead (bcrypt releases the GIL), with at most
+PASSWORD_HASH_MAX_PENDING calls queued; beyond that callers get
+PasswordHasherBusy, which main.py turns into 503 + Retry-After.
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from passlib.context import CryptContext
+
+import metrics
+from config import get_settings
+
+
+class PasswordHasherBusy(Exception):
+    def __init__(self, retry_after: int) -> None:
+        super().__init__("Password hashing queue is full")
+        self.retry_after = retry_after
+
+
+class PasswordHasher:
+    def __init__(self, rounds: int, workers: int, max_pending: int, retry_after: int = 1) -> None:
+        # min_rounds is what makes verify_and_update flag hashes made at a lower cost for rehash.
+        self.ctx = CryptContext(
+            schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds, bcrypt__min_rounds=rounds
+        )
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+        self.retry_after = retry_after
+        self.pending = 0
+        self.rejected = 0
+        self.latency = metrics.LatencyHistogram()
+        self._pool: ThreadPoolExecutor | None = None
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    async def _run(self, fn, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise PasswordHasherBusy(self.retry_after)
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        self.pending += 1
+        started = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool, fn, *args)
+        finally:
+            self.pending -= 1
+            self.latency.observe(time.perf_counter() - started)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.ctx.hash, password)
+
+    async def verify(self, password: str, hashed: str) -> tuple[bool, str | None]:
+        """(matches, new_hash); new_hash is set when the stored hash used a lower cost than BCRYPT_ROUNDS."""
+        return await self._run(self.ctx.verify_and_update, password, hashed)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "rejected": self.rejected,
+            "latency": self.latency.snapshot(),
+        }
+
+
+_settings = get_settings()
+hasher = PasswordHasher(
+    rounds=_settings.bcrypt_rounds,
+    workers=_settings.password_hash_workers,
+    max_pending=_settings.password_hash_max_pending,
+)
+metrics.register("password_hasher", hasher.stats)
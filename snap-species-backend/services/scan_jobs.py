@@ -0,0 +1,176 @@
+"""Asynchronous scans: submit returns a job id, the work runs on a bounded task pool.
+
+A job publishes events as results become available (species, then iucn,
+then result with the OpenAI text, or error). Clients poll the job or
+replay/subscribe to its events over SSE. Jobs live in memory for
+SCAN_JOB_TTL seconds after submission, so they are per worker process.
+"""
+import asyncio
+import logging
+import secrets
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+import metrics
+from cache import TTLCache
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class ScanJobsBusy(Exception):
+    def __init__(self, retry_after: int) -> None:
+        super().__init__("Scan job queue is full")
+        self.retry_after = retry_after
+
+
+class ScanJob:
+    def __init__(self, user_id: int | None) -> None:
+        self.id = secrets.token_urlsafe(16)
+        self.user_id = user_id
+        self.state = "queued"  # queued | running | done | failed
+        self.created = time.time()
+        self.events: list[tuple[str, Any]] = []
+        self._changed = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.state in ("done", "failed")
+
+    def latest(self, event: str) -> Any:
+        for name, data in reversed(self.events):
+            if name == event:
+                return data
+        return None
+
+    def publish(self, event: str, data: Any) -> None:
+        if self.finished:
+            return
+        self.events.append((event, data))
+        if event == "result":
+            self.state = "done"
+        elif event == "error":
+            self.state = "failed"
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def follow(self, since: int = 0, keepalive: float = 15.0) -> AsyncIterator[tuple[int, str, Any] | None]:
+        """(index, event, data) from `since` on until the job finishes; None every `keepalive` idle seconds."""
+        while True:
+            while since < len(self.events):
+                event, data = self.events[since]
+                yield since, event, data
+                since += 1
+            if self.finished:
+                return
+            try:
+                await asyncio.wait_for(self._changed.wait(), keepalive)
+            except asyncio.TimeoutError:
+                yield None
+
+
+class ScanJobs:
+    def __init__(self, workers: int, queue_max: int, ttl: float, max_jobs: int, retry_after: int = 2) -> None:
+        self.workers = max(1, workers)
+        self.queue_max = max(1, queue_max)
+        self.retry_after = retry_after
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.duration = metrics.LatencyHistogram()
+        self._jobs: TTLCache[ScanJob] = TTLCache(maxsize=max_jobs, ttl=ttl)
+        self._queue: asyncio.Queue[tuple[ScanJob, Callable[[ScanJob], Awaitable[None]]]] | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._inline: set[asyncio.Task] = set()
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_max)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Cancel running jobs and fail queued ones; their clients see an error event."""
+        tasks, self._tasks = self._tasks, []
+        for task in [*tasks, *self._inline]:
+            task.cancel()
+        await asyncio.gather(*tasks, *self._inline, return_exceptions=True)
+        while self._queue is not None and not self._queue.empty():
+            job, _ = self._queue.get_nowait()
+            job.publish("error", {"detail": "Server is shutting down, please resubmit."})
+
+    def submit(self, user_id: int | None, work: Callable[[ScanJob], Awaitable[None]]) -> ScanJob:
+        """Queue `work(job)` and return the job at once; raises ScanJobsBusy when the queue is full.
+
+        Without running workers (scripts, tests) the job runs as a plain task instead.
+        """
+        job = ScanJob(user_id)
+        if self.running:
+            try:
+                self._queue.put_nowait((job, work))
+            except asyncio.QueueFull:
+                self.rejected += 1
+                raise ScanJobsBusy(self.retry_after) from None
+        else:
+            task = asyncio.create_task(self._execute(job, work))
+            self._inline.add(task)
+            task.add_done_callback(self._inline.discard)
+        self._jobs.set(job.id, job)
+        self.submitted += 1
+        return job
+
+    def get(self, job_id: str) -> ScanJob | None:
+        return self._jobs.get(job_id)
+
+    async def _worker(self) -> None:
+        while True:
+            job, work = await self._queue.get()
+            await self._execute(job, work)
+
+    async def _execute(self, job: ScanJob, work: Callable[[ScanJob], Awaitable[None]]) -> None:
+        job.state = "running"
+        started = time.perf_counter()
+        try:
+            await work(job)
+            if not job.finished:
+                job.publish("error", {"detail": "Scan ended without a result."})
+        except asyncio.CancelledError:
+            job.publish("error", {"detail": "Server is shutting down, please resubmit."})
+            raise
+        except Exception as e:
+            logger.exception("Scan job %s failed", job.id)
+            job.publish("error", {"detail": f"Could not process image: {e}"})
+        finally:
+            self.duration.observe(time.perf_counter() - started)
+            if job.state == "failed":
+                self.failed += 1
+            else:
+                self.completed += 1
+
+    def stats(self) -> dict:
+        return {
+            "workers": len(self._tasks),
+            "queued": self._queue.qsize() if self._queue else 0,
+            "jobs": len(self._jobs),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "duration": self.duration.snapshot(),
+        }
+
+
+_settings = get_settings()
+jobs = ScanJobs(
+    workers=_settings.scan_job_workers,
+    queue_max=_settings.scan_job_queue_max,
+    ttl=_settings.scan_job_ttl,
+    max_jobs=_settings.scan_job_max_jobs,
+    retry_after=_settings.inference_retry_after,
+)
+metrics.register("scan_jobs", jobs.stats)
@@ -0,0 +1,257 @@
+"""Single write path for new sightings, so derived data stays in step with the table.
+
+insert_sighting writes one row inline. SightingWriter is the write-behind
+path for /api/scan: rows are queued, and a background task writes whatever
+accumulated within SIGHTING_FLUSH_MS (up to SIGHTING_BATCH_MAX rows) as one
+multi-row INSERT in one transaction. stop() drains the queue before the
+pool closes; flush() waits (up to SIGHTING_FLUSH_TIMEOUT) until everything
+queued so far is committed.
+"""
+import asyncio
+import json
+import logging
+import time
+from typing import NamedTuple
+
+import asyncpg
+
+import metrics
+from config import get_settings
+from database import acquire
+from services import map_tiles, user_stats
+from services.leaderboard import snapshots
+
+logger = logging.getLogger(__name__)
+
+
+class NewSighting(NamedTuple):
+    user_id: int
+    name: str
+    sci: str
+    status: str
+    lat: float
+    lng: float
+    threat_score: int
+
+
+def _after_write(rows: list[NewSighting]) -> None:
+    for row in rows:
+        map_tiles.invalidate_point(row.lat, row.lng)
+    snapshots.mark_dirty()
+
+
+async def insert_sighting(
+    conn: asyncpg.Connection,
+    user_id: int,
+    name: str,
+    sci: str,
+    status: str,
+    lat: float,
+    lng: float,
+    threat_score: int,
+) -> asyncpg.Record:
+    """INSERT one sighting and update the user's counters atomically; returns the new row."""
+    async with conn.transaction():
+        row = await conn.fetchrow(
+            """INSERT INTO sightings (user_id, name, sci, status, lat, lng, threat_score)
+               VALUES ($1, $2, $3, $4, $5, $6, $7)
+               RETURNING id, user_id, name, sci, status, lat, lng, threat_score, created_at""",
+            user_id, name, sci, status, lat, lng, threat_score,
+        )
+        await user_stats.record_sighting(conn, user_id, sci, status, threat_score)
+    _after_write([NewSighting(user_id, name, sci, status, lat, lng, threat_score)])
+    return row
+
+
+async def insert_sightings(conn: asyncpg.Connection, rows: list[NewSighting]) -> None:
+    """Multi-row INSERT plus counter updates, all in one transaction."""
+    columns = list(zip(*rows))
+    async with conn.transaction():
+        await conn.execute(
+            """INSERT INTO sightings (user_id, name, sci, status, lat, lng, threat_score)
+               SELECT * FROM unnest($1::int[], $2::text[], $3::text[], $4::text[],
+                                    $5::float8[], $6::float8[], $7::int[])""",
+            *columns,
+        )
+        by_user: dict[int, list[NewSighting]] = {}
+        for row in rows:
+            by_user.setdefault(row.user_id, []).append(row)
+        # One counter update per user, in user order so concurrent batches take the locks in the same order.
+        for user_id in sorted(by_user):
+            user_rows = by_user[user_id]
+            await user_stats.record_bulk(
+                conn,
+                user_id,
+                [r.sci for r in user_rows],
+                [r.status in user_stats.ENDANGERED_STATUSES for r in user_rows],
+                sum(r.threat_score for r in user_rows),
+            )
+    _after_write(rows)
+
+
+class SightingWriter:
+    def __init__(self, flush_ms: float, batch_max: int, queue_max: int) -> None:
+        self.flush_interval = max(0.0, flush_ms) / 1000
+        self.batch_max = max(1, batch_max)
+        self.queue_max = max(1, queue_max)
+        self.batches = 0
+        self.written = 0
+        self.failures = 0
+        self.write_time = metrics.LatencyHistogram()
+        self._queue: asyncio.Queue[tuple[NewSighting, asyncio.Future] | None] | None = None
+        self._pending: set[asyncio.Future] = set()
+        self._worker: asyncio.Task | None = None
+        self._stopping = False
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None and not self._worker.done() and not self._stopping
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._stopping = False
+        self._queue = asyncio.Queue(maxsize=self.queue_max)
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Write everything already queued, then stop. Call before the DB pool closes."""
+        if self._worker is None:
+            return
+        self._stopping = True
+        await self._queue.put(None)  # FIFO: every row queued before this is written first
+        await self._worker
+        self._worker = None
+
+    async def enqueue(self, sighting: NewSighting) -> asyncio.Future[bool]:
+        """Queue one sighting; the returned future resolves to True once it is committed
+        (False if the database rejected it or was unreachable at shutdown).
+
+        Waits only when SIGHTING_QUEUE_MAX rows are already queued. Without a
+        running writer (scripts, shutdown) the row is written inline instead.
+        """
+        fut = asyncio.get_running_loop().create_future()
+        if not self.running:
+            async with acquire() as conn:
+                await insert_sightings(conn, [sighting])
+            fut.set_result(True)
+            return fut
+        self._pending.add(fut)
+        fut.add_done_callback(self._pending.discard)
+        await self._queue.put((sighting, fut))
+        return fut
+
+    async def flush(self, timeout: float | None = None) -> bool:
+        """Wait until every sighting queued before this call has been written.
+
+        Gives up after `timeout` seconds (default SIGHTING_FLUSH_TIMEOUT) and
+        returns False, so readers serve slightly stale data during a DB outage
+        instead of hanging while the writer retries.
+        """
+        if not self._pending:
+            return True
+        if timeout is None:
+            timeout = get_settings().sighting_flush_timeout
+        _, not_done = await asyncio.wait(list(self._pending), timeout=timeout)
+        return not not_done
+
+    async def _collect(self) -> tuple[list[tuple[NewSighting, asyncio.Future]], bool]:
+        """Next batch, and whether the stop marker was reached."""
+        loop = asyncio.get_running_loop()
+        first = await self._queue.get()
+        if first is None:
+            return [], True
+        batch = [first]
+        deadline = loop.time() + self.flush_interval
+        while len(batch) < self.batch_max:
+            try:
+                item = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    async def _run(self) -> None:
+        done = False
+        while not done:
+            batch, done = await self._collect()
+            if not batch:
+                continue
+            try:
+                await self._write(batch)
+            except Exception:
+                # A bug here must not kill the worker and leave flush() waiting on these futures.
+                self.failures += 1
+                logger.exception("Sighting batch of %d failed unexpectedly", len(batch))
+                for sighting, _ in batch:
+                    logger.error("Unwritten sighting: %s", json.dumps(sighting._asdict()))
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_result(False)
+
+    async def _write(self, batch: list[tuple[NewSighting, asyncio.Future]]) -> None:
+        rows = [sighting for sighting, _ in batch]
+        delay, attempt = 0.1, 0
+        while True:
+            attempt += 1
+            started = time.perf_counter()
+            try:
+                async with acquire() as conn:
+                    await insert_sightings(conn, rows)
+                break
+            except (OSError, asyncio.TimeoutError, asyncpg.InterfaceError, asyncpg.PostgresConnectionError):
+                self.failures += 1
+                logger.exception("Sighting batch of %d failed (attempt %d)", len(rows), attempt)
+            except asyncpg.PostgresError:
+                # The database rejected a row; retrying the batch would block the queue forever.
+                self.failures += 1
+                if len(batch) > 1:
+                    for item in batch:
+                        await self._write([item])
+                    return
+                logger.exception("Dropping rejected sighting: %s", json.dumps(rows[0]._asdict()))
+                batch[0][1].set_result(False)
+                return
+            if self._stopping and attempt >= 3:
+                # Shutting down and the DB is unreachable: leave the rows in the log, not nowhere.
+                for row in rows:
+                    logger.error("Unwritten sighting: %s", json.dumps(row._asdict()))
+                for _, fut in batch:
+                    fut.set_result(False)
+                return
+            # Rows stay in memory and are retried rather than dropped on a DB blip.
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 5.0)
+        self.write_time.observe(time.perf_counter() - started)
+        self.batches += 1
+        self.written += len(rows)
+        for _, fut in batch:
+            fut.set_result(True)
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "pending": len(self._pending),
+            "batches": self.batches,
+            "written": self.written,
+            "failures": self.failures,
+            "avg_batch": round(self.written / self.batches, 1) if self.batches else 0.0,
+            "write_time": self.write_time.snapshot(),
+        }
+
+
+_settings = get_settings()
+writer = SightingWriter(
+    flush_ms=_settings.sighting_flush_ms,
+    batch_max=_settings.sighting_batch_max,
+    queue_max=_settings.sighting_queue_max,
+)
+metrics.register("sighting_writer", writer.stats)
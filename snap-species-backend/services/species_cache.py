@@ -0,0 +1,167 @@
+"""Two-tier cache for per-species enrichment (OpenAI facts, IUCN lookups).
+
+Tier 1 is an in-process LRU, tier 2 the species_cache table shared by all
+workers. Entries older than SPECIES_CACHE_TTL are still served until
+SPECIES_CACHE_STALE_TTL while a background task refreshes them; empty
+("not found") results are kept for SPECIES_CACHE_NEGATIVE_TTL.
+"""
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Awaitable, Callable
+
+import metrics
+from cache import TTLCache
+from config import get_settings
+from database import acquire
+
+logger = logging.getLogger(__name__)
+
+_settings = get_settings()
+_memory: TTLCache[tuple[float, Any]] = TTLCache(
+    maxsize=_settings.species_cache_size, ttl=_settings.species_cache_stale_ttl
+)
+_inflight: dict[tuple[str, str], asyncio.Task] = {}
+_stats = {"memory_hits": 0, "db_hits": 0, "misses": 0, "stale_served": 0, "negative_hits": 0, "refreshes": 0}
+
+
+def normalize_sci(sci: str) -> str:
+    return " ".join((sci or "").lower().split())
+
+
+def _is_empty(value: Any) -> bool:
+    return value is None or value == [] or value == {}
+
+
+def _always(value: Any) -> bool:
+    return True
+
+
+async def _db_get(kind: str, key: str) -> tuple[float, Any] | None:
+    try:
+        async with acquire() as conn:
+            row = await conn.fetchrow(
+                "SELECT payload::text AS payload, EXTRACT(EPOCH FROM fetched_at) AS fetched "
+                "FROM species_cache WHERE kind = $1 AND sci_key = $2",
+                kind, key,
+            )
+    except Exception as e:
+        logger.warning("species_cache read failed: %s", e)
+        return None
+    if not row:
+        return None
+    payload = json.loads(row["payload"]) if row["payload"] is not None else None
+    return float(row["fetched"]), payload
+
+
+async def _db_put(kind: str, key: str, fetched: float, value: Any) -> None:
+    try:
+        async with acquire() as conn:
+            await conn.execute(
+                """INSERT INTO species_cache (kind, sci_key, payload, fetched_at)
+                   VALUES ($1, $2, $3::jsonb, to_timestamp($4))
+                   ON CONFLICT (kind, sci_key) DO UPDATE
+                   SET payload = EXCLUDED.payload, fetched_at = EXCLUDED.fetched_at""",
+                kind, key, json.dumps(value), fetched,
+            )
+    except Exception as e:
+        logger.warning("species_cache write failed: %s", e)
+
+
+async def _load(
+    kind: str,
+    key: str,
+    loader: Callable[[], Awaitable[Any]],
+    cacheable: Callable[[Any], bool],
+) -> Any:
+    value = await loader()
+    if cacheable(value):
+        fetched = time.time()
+        _memory.set((kind, key), (fetched, value), ttl=get_settings().species_cache_stale_ttl)
+        await _db_put(kind, key, fetched, value)
+    return value
+
+
+def _start_load(
+    kind: str,
+    key: str,
+    loader: Callable[[], Awaitable[Any]],
+    cacheable: Callable[[Any], bool],
+) -> asyncio.Task:
+    """One loader task per key, shared by concurrent misses.
+
+    The task is not tied to any request, so a lookup abandoned by the scan
+    deadline still completes and warms the cache for the next caller.
+    """
+    task = _inflight.get((kind, key))
+    if task is None:
+        task = asyncio.ensure_future(_load(kind, key, loader, cacheable))
+        _inflight[(kind, key)] = task
+
+        def _done(t: asyncio.Task) -> None:
+            _inflight.pop((kind, key), None)
+            if not t.cancelled() and t.exception() is not None:
+                logger.warning("species_cache load of %s/%s failed: %s", kind, key, t.exception())
+
+        task.add_done_callback(_done)
+    return task
+
+
+async def get_or_fetch(
+    kind: str,
+    sci: str,
+    loader: Callable[[], Awaitable[Any]],
+    cacheable: Callable[[Any], bool] = _always,
+) -> Any:
+    """Return the cached value for (kind, sci), calling loader on a miss.
+
+    Results for which cacheable() is False (quota errors, missing keys) are
+    returned but not stored; exceptions from loader propagate and are never stored.
+    """
+    key = normalize_sci(sci)
+    if not key:
+        return await loader()
+    entry = _memory.get((kind, key))
+    if entry is not None:
+        _stats["memory_hits"] += 1
+    else:
+        entry = await _db_get(kind, key)
+        if entry is not None:
+            _stats["db_hits"] += 1
+            _memory.set((kind, key), entry, ttl=get_settings().species_cache_stale_ttl)
+    if entry is not None:
+        settings = get_settings()
+        fetched, value = entry
+        age = time.time() - fetched
+        empty = _is_empty(value)
+        fresh_ttl = settings.species_cache_negative_ttl if empty else settings.species_cache_ttl
+        if age < fresh_ttl:
+            if empty:
+                _stats["negative_hits"] += 1
+            return value
+        if not empty and age < settings.species_cache_stale_ttl:
+            _stats["stale_served"] += 1
+            if (kind, key) not in _inflight:
+                _stats["refreshes"] += 1
+                _start_load(kind, key, loader, cacheable)
+            return value
+    _stats["misses"] += 1
+    return await asyncio.shield(_start_load(kind, key, loader, cacheable))
+
+
+def invalidate(sci: str | None = None) -> None:
+    """Drop in-process entries for one species (all kinds) or everything."""
+    if sci is None:
+        _memory.clear()
+        return
+    key = normalize_sci(sci)
+    for kind in ("openai", "iucn", "threats", "habitats"):
+        _memory.pop((kind, key))
+
+
+def cache_stats() -> dict:
+    return {**_stats, "memory": _memory.stats()}
+
+
+metrics.register("species_cache", cache_stats)
@@ -0,0 +1,137 @@
+"""Per-user sighting totals, maintained on insert instead of aggregated per request.
+
+user_species holds each user's distinct species (normalised LOWER(TRIM(sci)))
+and whether any sighting of it was endangered; user_stats holds the counters
+the leaderboard and profile read. record_sighting must run in the same
+transaction as the sighting INSERT.
+"""
+import asyncpg
+
+ENDANGERED_STATUSES = ("CR", "EN", "VU")
+
+# pg_advisory_xact_lock(class, user_id): serialises counter updates per user
+# so single and bulk writers can both compute deltas safely.
+_LOCK_CLASS = 0x5553  # "US"
+
+# The aggregation the leaderboard ran before user_stats existed; kept as the
+# reference for check_consistency.
+LIVE_STATS_QUERY = """
+    SELECT
+        u.id AS user_id,
+        COUNT(s.id) AS sightings,
+        COUNT(DISTINCT LOWER(TRIM(s.sci))) AS species,
+        COUNT(DISTINCT CASE WHEN s.status IN ('CR', 'EN', 'VU') THEN LOWER(TRIM(s.sci)) END) AS endangered_species,
+        COALESCE(AVG(s.threat_score), 0) AS avg_threat_score
+    FROM users u
+    LEFT JOIN sightings s ON s.user_id = u.id
+    GROUP BY u.id
+"""
+
+
+async def record_sighting(conn: asyncpg.Connection, user_id: int, sci: str, status: str, threat_score: int) -> None:
+    """Fold one new sighting into the user's counters. Safe under concurrent inserts."""
+    await conn.execute("SELECT pg_advisory_xact_lock($1, $2)", _LOCK_CLASS, user_id)
+    endangered = status in ENDANGERED_STATUSES
+    new_species = await conn.fetchval(
+        """INSERT INTO user_species (user_id, sci_key, endangered)
+           VALUES ($1, LOWER(TRIM($2)), $3)
+           ON CONFLICT (user_id, sci_key) DO NOTHING
+           RETURNING TRUE""",
+        user_id, sci, endangered,
+    )
+    if new_species:
+        new_endangered = endangered
+    elif endangered:
+        new_endangered = bool(await conn.fetchval(
+            """UPDATE user_species SET endangered = TRUE
+               WHERE user_id = $1 AND sci_key = LOWER(TRIM($2)) AND NOT endangered
+               RETURNING TRUE""",
+            user_id, sci,
+        ))
+    else:
+        new_endangered = False
+    await conn.execute(
+        """INSERT INTO user_stats (user_id, sightings, species, endangered_species, threat_sum)
+           VALUES ($1, 1, $2, $3, $4)
+           ON CONFLICT (user_id) DO UPDATE SET
+               sightings = user_stats.sightings + 1,
+               species = user_stats.species + EXCLUDED.species,
+               endangered_species = user_stats.endangered_species + EXCLUDED.endangered_species,
+               threat_sum = user_stats.threat_sum + EXCLUDED.threat_sum""",
+        user_id, int(bool(new_species)), int(new_endangered), threat_score,
+    )
+
+
+async def record_bulk(
+    conn: asyncpg.Connection, user_id: int, scis: list[str], endangered: list[bool], threat_sum: int
+) -> None:
+    """Fold many new sightings of one user into their counters (same transaction as the COPY)."""
+    await conn.execute("SELECT pg_advisory_xact_lock($1, $2)", _LOCK_CLASS, user_id)
+    count_species = """SELECT COUNT(*) AS species, COUNT(*) FILTER (WHERE endangered) AS endangered
+                       FROM user_species WHERE user_id = $1"""
+    before = await conn.fetchrow(count_species, user_id)
+    await conn.execute(
+        """INSERT INTO user_species (user_id, sci_key, endangered)
+           SELECT $1, LOWER(TRIM(sci)), bool_or(e)
+           FROM unnest($2::text[], $3::bool[]) AS t(sci, e)
+           GROUP BY LOWER(TRIM(sci))
+           ON CONFLICT (user_id, sci_key) DO UPDATE
+           SET endangered = user_species.endangered OR EXCLUDED.endangered""",
+        user_id, scis, endangered,
+    )
+    after = await conn.fetchrow(count_species, user_id)
+    await conn.execute(
+        """INSERT INTO user_stats (user_id, sightings, species, endangered_species, threat_sum)
+           VALUES ($1, $2, $3, $4, $5)
+           ON CONFLICT (user_id) DO UPDATE SET
+               sightings = user_stats.sightings + EXCLUDED.sightings,
+               species = user_stats.species + EXCLUDED.species,
+               endangered_species = user_stats.endangered_species + EXCLUDED.endangered_species,
+               threat_sum = user_stats.threat_sum + EXCLUDED.threat_sum""",
+        user_id, len(scis), after["species"] - before["species"], after["endangered"] - before["endangered"],
+        threat_sum,
+    )
+
+
+async def rebuild(conn: asyncpg.Connection) -> None:
+    """Recompute both tables from sightings. Blocks sighting inserts while it runs."""
+    async with conn.transaction():
+        await conn.execute("LOCK TABLE sightings IN SHARE MODE")
+        await conn.execute("TRUNCATE user_species, user_stats")
+        await conn.execute("""
+            INSERT INTO user_species (user_id, sci_key, endangered)
+            SELECT user_id, LOWER(TRIM(sci)), bool_or(status IN ('CR', 'EN', 'VU'))
+            FROM sightings
+            GROUP BY user_id, LOWER(TRIM(sci))
+        """)
+        await conn.execute("""
+            INSERT INTO user_stats (user_id, sightings, species, endangered_species, threat_sum)
+            SELECT s.user_id, s.sightings, sp.species, sp.endangered_species, s.threat_sum
+            FROM (
+                SELECT user_id, COUNT(*) AS sightings, SUM(threat_score) AS threat_sum
+                FROM sightings GROUP BY user_id
+            ) s
+            JOIN (
+                SELECT user_id, COUNT(*) AS species, COUNT(*) FILTER (WHERE endangered) AS endangered_species
+                FROM user_species GROUP BY user_id
+            ) sp ON sp.user_id = s.user_id
+        """)
+
+
+async def check_consistency(conn: asyncpg.Connection) -> list[dict]:
+    """Users whose stored counters differ from LIVE_STATS_QUERY; empty when in sync."""
+    rows = await conn.fetch(f"""
+        SELECT live.user_id,
+               live.sightings AS live_sightings, COALESCE(st.sightings, 0) AS stored_sightings,
+               live.species AS live_species, COALESCE(st.species, 0) AS stored_species,
+               live.endangered_species AS live_endangered, COALESCE(st.endangered_species, 0) AS stored_endangered,
+               live.avg_threat_score AS live_avg, COALESCE(st.avg_threat_score, 0) AS stored_avg
+        FROM ({LIVE_STATS_QUERY}) live
+        LEFT JOIN user_stats st ON st.user_id = live.user_id
+    """)
+    return [
+        dict(r) for r in rows
+        if (r["live_sightings"], r["live_species"], r["live_endangered"])
+        != (r["stored_sightings"], r["stored_species"], r["stored_endangered"])
+        or abs(float(r["live_avg"]) - float(r["stored_avg"])) > 1e-6
+    ]